@@ -0,0 +1,76 @@
+"""Login and token refresh latency of the API client."""
+from __future__ import annotations
+from datetime import datetime
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.wn_smartmeter.api import WienerNetzeAPI
+from common import run
+from mock_server import MockConfig, MockWienerNetze
+
+LATENCIES = [MockConfig(latency=0.0), MockConfig(latency=0.05)]
+
+
+@pytest.mark.parametrize("mock_config", LATENCIES, ids=["0ms", "50ms"])
+def test_login(
+    benchmark, hass: HomeAssistant, mock_server: MockWienerNetze, api: WienerNetzeAPI
+) -> None:
+    """Full login: login page, credentials, token and app config."""
+    mock_server.reset()
+    assert benchmark.pedantic(lambda: run(hass, api.login()), rounds=20)
+    benchmark.extra_info["requests_per_login"] = mock_server.total_requests / 20
+
+
+@pytest.mark.parametrize("mock_config", LATENCIES, ids=["0ms", "50ms"])
+def test_token_refresh(
+    benchmark, hass: HomeAssistant, mock_server: MockWienerNetze, api: WienerNetzeAPI
+) -> None:
+    """Expired access token that is renewed with the refresh token."""
+    run(hass, api.login())
+    mock_server.reset()
+
+    def expire() -> None:
+        api._tokens.access_expires = datetime.now()  # noqa: SLF001
+
+    benchmark.pedantic(lambda: run(hass, api.ensure_login()), setup=expire, rounds=20)
+    assert mock_server.requests["login_page"] == 0
+    benchmark.extra_info["requests_per_refresh"] = mock_server.total_requests / 20
+
+
+def test_token_refresh_after_restart(
+    benchmark, hass: HomeAssistant, mock_server: MockWienerNetze, api: WienerNetzeAPI
+) -> None:
+    """A new client refreshes the persisted tokens instead of logging in."""
+    run(hass, api.login())
+    run(hass, api.async_close())
+    mock_server.reset()
+    clients = []
+
+    def restart() -> None:
+        client = WienerNetzeAPI(hass, mock_server.config.username, mock_server.config.password)
+        run(hass, client._async_restore())  # noqa: SLF001
+        client._tokens.access_expires = datetime.now()  # noqa: SLF001
+        clients.append(client)
+
+    benchmark.pedantic(lambda: run(hass, clients[-1].ensure_login()), setup=restart, rounds=5)
+    assert mock_server.requests["login_page"] == 0
+    assert mock_server.requests["token"] == 5
+    for client in clients:
+        run(hass, client.async_close())
+
+
+@pytest.mark.parametrize(
+    "mock_config",
+    [MockConfig(error_rate=0.0), MockConfig(error_rate=0.2)],
+    ids=["no_errors", "20%_errors"],
+)
+def test_api_call(
+    benchmark, hass: HomeAssistant, mock_server: MockWienerNetze, api: WienerNetzeAPI
+) -> None:
+    """One uncached gateway request, retried on gateway errors."""
+    run(hass, api.login())
+    mock_server.reset()
+    benchmark.pedantic(lambda: run(hass, api.get_consumptions()), rounds=10)
+    benchmark.extra_info["requests"] = mock_server.total_requests
+    benchmark.extra_info["retries"] = api.retries
@@ -0,0 +1,82 @@
+"""Refresh latency, requests per refresh and memory per meter of the coordinator."""
+from __future__ import annotations
+import gc
+import tracemalloc
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from common import create_coordinator, run
+from mock_server import MockConfig, MockWienerNetze
+
+METERS = [1, 10, 100]
+
+
+@pytest.fixture
+def mock_config() -> MockConfig:
+    """Serve enough meters for every benchmark."""
+    return MockConfig(meters=max(METERS))
+
+
+@pytest.mark.parametrize("meters", METERS)
+def test_first_refresh(
+    benchmark,
+    recorder_mock,
+    hass: HomeAssistant,
+    mock_server: MockWienerNetze,
+    meters: int,
+) -> None:
+    """Cold refresh: login, meter values and the statistics warm up."""
+    coordinator = create_coordinator(hass, mock_server, meters)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    benchmark.pedantic(lambda: run(hass, coordinator.async_refresh()), rounds=1)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    assert coordinator.last_update_success
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    benchmark.extra_info["requests"] = mock_server.total_requests
+    benchmark.extra_info["retained_bytes_per_meter"] = retained // meters
+    run(hass, coordinator.wienernetze_api.async_close())
+
+
+@pytest.mark.parametrize("meters", METERS)
+def test_refresh(
+    benchmark,
+    recorder_mock,
+    hass: HomeAssistant,
+    mock_server: MockWienerNetze,
+    meters: int,
+) -> None:
+    """Steady state refresh after the first one."""
+    coordinator = create_coordinator(hass, mock_server, meters)
+    run(hass, coordinator.async_refresh())
+    mock_server.reset()
+    benchmark.pedantic(lambda: run(hass, coordinator.async_refresh()), rounds=5)
+    assert coordinator.last_update_success
+    benchmark.extra_info["requests_per_refresh"] = mock_server.total_requests / 5
+    benchmark.extra_info["requests"] = dict(mock_server.requests)
+    run(hass, coordinator.wienernetze_api.async_close())
+
+
+@pytest.mark.parametrize(
+    "mock_config",
+    [MockConfig(meters=10, latency=0.05), MockConfig(meters=10, error_rate=0.1)],
+    ids=["50ms", "10%_errors"],
+)
+def test_refresh_degraded_gateway(
+    benchmark,
+    recorder_mock,
+    hass: HomeAssistant,
+    mock_server: MockWienerNetze,
+) -> None:
+    """Steady state refresh of 10 meters against a slow or failing gateway."""
+    coordinator = create_coordinator(hass, mock_server, 10)
+    run(hass, coordinator.async_refresh())
+    mock_server.reset()
+    benchmark.pedantic(lambda: run(hass, coordinator.async_refresh()), rounds=3)
+    benchmark.extra_info["requests_per_refresh"] = mock_server.total_requests / 3
+    benchmark.extra_info["retries"] = coordinator.wienernetze_api.retries
+    run(hass, coordinator.wienernetze_api.async_close())
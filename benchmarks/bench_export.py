@@ -0,0 +1,72 @@
+"""Throughput and peak memory of the export service."""
+from __future__ import annotations
+import gc
+import tracemalloc
+from datetime import timedelta
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.wn_smartmeter.api import WienerNetzeAPI
+from custom_components.wn_smartmeter.export import WRITERS, async_export
+from common import run
+from mock_server import MockConfig, MockWienerNetze, customer_id, meter_reader
+
+RETAINED_LIMIT = 256 * 1024
+
+
+@pytest.fixture
+def mock_config() -> MockConfig:
+    """Serve quarter hour intervals."""
+    return MockConfig(meters=1, resolution_minutes=15)
+
+
+@pytest.mark.parametrize("file_format", list(WRITERS))
+@pytest.mark.parametrize("days", [30, 365])
+def test_export(
+    benchmark,
+    hass: HomeAssistant,
+    mock_server: MockWienerNetze,
+    api: WienerNetzeAPI,
+    tmp_path,
+    file_format: str,
+    days: int,
+) -> None:
+    """Export a month and a year of 15 minute data, peak memory should not grow."""
+    end = dt_util.start_of_local_day()
+    start = end - timedelta(days=days)
+    path = str(tmp_path / f"export.{file_format}")
+
+    def export() -> int:
+        return run(
+            hass,
+            async_export(
+                hass,
+                api,
+                meter_reader(0),
+                customer_id(0),
+                start,
+                end,
+                path,
+                file_format,
+                "QUARTER-HOUR",
+            ),
+        )
+
+    # log in before measuring
+    run(hass, api.ensure_login())
+    gc.collect()
+    tracemalloc.start()
+    rows = benchmark.pedantic(export, rounds=1)
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert rows == (end - start).total_seconds() // 900
+    # nothing of the exported range may stay behind, a year of rows is megabytes
+    assert retained < RETAINED_LIMIT
+    benchmark.extra_info["rows"] = rows
+    benchmark.extra_info["peak_bytes"] = peak
+    benchmark.extra_info["retained_bytes"] = retained
+    benchmark.extra_info["requests"] = mock_server.requests["verbrauch"]
@@ -0,0 +1,62 @@
+"""Compare parse time and peak memory of the login form extraction.
+
+Run with ``python benchmarks/bench_login_form.py [page.html ...]``. Without
+arguments the pages in benchmarks/data are used. lxml is only measured when
+it is installed.
+"""
+import importlib.util
+import pathlib
+import sys
+import timeit
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+DATA = pathlib.Path(__file__).resolve().parent / "data"
+
+
+def _load_login_form():
+    """Load the parser module without importing Home Assistant."""
+    path = ROOT / "custom_components" / "wn_smartmeter" / "api" / "login_form.py"
+    spec = importlib.util.spec_from_file_location("login_form", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _lxml_action(body):
+    from lxml import html
+
+    return html.fromstring(body).xpath("(//form/@action)")[0]
+
+
+def _measure(func, body, number=2000):
+    seconds = min(timeit.repeat(lambda: func(body), number=number, repeat=5)) / number
+    tracemalloc.start()
+    func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(paths):
+    """Print one line per page and parser."""
+    parsers = {"html.parser": _load_login_form().extract_form_action}
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        parsers["lxml"] = _lxml_action
+
+    for path in paths:
+        body = pathlib.Path(path).read_text(encoding="utf-8")
+        for name, func in parsers.items():
+            seconds, peak = _measure(func, body)
+            print(  # noqa: T201
+                f"{pathlib.Path(path).name:24} {name:12} "
+                f"{seconds * 1e6:8.1f} us {peak / 1024:8.1f} KiB peak  {func(body)[:60]}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or sorted(DATA.glob("*.html")))
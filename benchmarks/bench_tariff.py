@@ -0,0 +1,80 @@
+"""Throughput of pricing a year of intervals, correct across daylight saving switches."""
+from __future__ import annotations
+from array import array
+from datetime import datetime
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.wn_smartmeter.const import TIMEZONE
+from custom_components.wn_smartmeter.tariff import (
+    TimeOfUseTariff,
+    hours_of_week,
+    parse_schedule,
+)
+
+SCHEDULE = "mon-fri 06-22=0.28; 22-06=0.19; sat,sun 06-22=0.21"
+
+
+def _timestamps(start: str, end: str, step: int = 900) -> array:
+    """Return the interval starts in [start, end) of local ISO dates."""
+    time_zone = dt_util.get_time_zone(TIMEZONE)
+    low, high = (
+        int(datetime.fromisoformat(day).replace(tzinfo=time_zone).timestamp())
+        for day in (start, end)
+    )
+    return array("q", range(low, high, step))
+
+
+def _hours_of_week(timestamps: array) -> list[int]:
+    """Return the local hour of the week of every interval from the day runs."""
+    return [int(hour) for hour in hours_of_week(timestamps, dt_util.get_time_zone(TIMEZONE))]
+
+
+def _reference(timestamps: array) -> list[int]:
+    """Return the local hour of the week of every interval, one by one."""
+    time_zone = dt_util.get_time_zone(TIMEZONE)
+    hours = []
+    for timestamp in timestamps:
+        local = dt_util.utc_from_timestamp(timestamp).astimezone(time_zone)
+        hours.append(local.weekday() * 24 + local.hour)
+    return hours
+
+
+@pytest.mark.parametrize(
+    ("start", "end"),
+    [
+        ("2024-01-01", "2025-01-01"),
+        # a single day with a switch, at the start of a run
+        ("2024-03-31", "2024-04-01"),
+        ("2024-10-27", "2024-10-28"),
+        # runs that end right before and start right after a switch
+        ("2024-03-30", "2024-04-02"),
+        ("2024-10-26T02:15", "2024-10-29T01:30"),
+    ],
+)
+def test_hours_of_week_across_switches(start: str, end: str) -> None:
+    """The day runs give the same hours as converting every interval."""
+    timestamps = _timestamps(start, end)
+    assert _hours_of_week(timestamps) == _reference(timestamps)
+
+
+def test_switch_days() -> None:
+    """The spring switch skips sunday 2:00, the autumn switch repeats it."""
+    spring = _hours_of_week(_timestamps("2024-03-31", "2024-04-01", 3600))
+    autumn = _hours_of_week(_timestamps("2024-10-27", "2024-10-28", 3600))
+    sunday_two = 6 * 24 + 2
+    assert len(spring) == 23 and sunday_two not in spring
+    assert len(autumn) == 25 and autumn.count(sunday_two) == 2
+
+
+def test_prices(benchmark) -> None:
+    """Price a year of quarter hours with a time of use tariff."""
+    timestamps = _timestamps("2024-01-01", "2025-01-01")
+    tariff = TimeOfUseTariff(SCHEDULE)
+    table = parse_schedule(SCHEDULE)
+    prices = benchmark(tariff.prices, timestamps)
+    assert [float(price) for price in prices] == [
+        table[hour] for hour in _reference(timestamps)
+    ]
+    benchmark.extra_info["intervals"] = len(timestamps)
@@ -0,0 +1,47 @@
+"""Helpers of the benchmark suite."""
+from __future__ import annotations
+from collections.abc import Awaitable
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.wn_smartmeter.const import (
+    DOMAIN,
+    DEFAULT_SCAN_INTERVAL,
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_METER_READER,
+    CONF_CUSTOMER_ID,
+    CONF_SCAN_INTERVAL,
+)
+from custom_components.wn_smartmeter.coordinator import WienerNetzeUpdateCoordinator
+from mock_server import MockWienerNetze, customer_id, meter_reader
+
+
+def run(hass: HomeAssistant, awaitable: Awaitable):
+    """Run a coroutine on the loop of hass from a synchronous benchmark."""
+    return hass.loop.run_until_complete(awaitable)
+
+
+def create_coordinator(
+    hass: HomeAssistant, server: MockWienerNetze, meters: int
+) -> WienerNetzeUpdateCoordinator:
+    """Create a coordinator with the first meters of the mock server."""
+    coordinator = WienerNetzeUpdateCoordinator(
+        hass, server.config.username, server.config.password
+    )
+    for index in range(meters):
+        coordinator.add_meter(
+            MockConfigEntry(
+                domain=DOMAIN,
+                unique_id=meter_reader(index),
+                data={
+                    CONF_USERNAME: server.config.username,
+                    CONF_PASSWORD: server.config.password,
+                    CONF_METER_READER: meter_reader(index),
+                    CONF_CUSTOMER_ID: customer_id(index),
+                    CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+                },
+            )
+        )
+    return coordinator
@@ -0,0 +1,57 @@
+"""Fixtures that run the integration against the local mock server."""
+from __future__ import annotations
+
+import pytest
+from aiohttp.test_utils import TestServer
+from homeassistant.core import HomeAssistant
+
+from custom_components.wn_smartmeter.api import WienerNetzeAPI, client
+from mock_server import (
+    API_PATH,
+    AUTH_PATH,
+    CONFIG_PATH,
+    MockConfig,
+    MockWienerNetze,
+)
+
+
+@pytest.fixture
+def mock_config() -> MockConfig:
+    """Return the behaviour of the mock server, parametrize to change it."""
+    return MockConfig()
+
+
+@pytest.fixture(autouse=True)
+def unthrottled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Lift the client side rate limit, it would dominate every measurement."""
+    monkeypatch.setattr(client, "API_RATE_LIMIT", 1e6)
+    monkeypatch.setattr(client, "API_RATE_BURST", 1_000_000)
+
+
+@pytest.fixture
+async def mock_server(
+    hass: HomeAssistant,
+    socket_enabled: None,
+    mock_config: MockConfig,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Start the mock server and point the client at it."""
+    server = MockWienerNetze(mock_config)
+    test_server = TestServer(server.app, host="127.0.0.1")
+    await test_server.start_server()
+    base_url = str(test_server.make_url("")).rstrip("/")
+    monkeypatch.setattr(client, "AUTH_URL", base_url + AUTH_PATH)
+    monkeypatch.setattr(client, "API_URL", base_url + API_PATH)
+    monkeypatch.setattr(client, "API_CONFIG_URL", base_url + CONFIG_PATH)
+    yield server
+    await test_server.close()
+
+
+@pytest.fixture
+async def api(hass: HomeAssistant, mock_server: MockWienerNetze):
+    """Return a client of the mock server."""
+    wienernetze_api = WienerNetzeAPI(
+        hass, mock_server.config.username, mock_server.config.password
+    )
+    yield wienernetze_api
+    await wienernetze_api.async_close()
@@ -0,0 +1,331 @@
+"""Local stand-in for log.wien, the smart meter web app and the WSTW gateway.
+
+It serves the Keycloak login form, the token endpoint, ``app-config.json``
+and the smart meter API endpoints the integration uses, with configurable
+latency, error rate, number of meters and payload resolution. Every request
+is counted per endpoint.
+
+Run it on its own with ``python benchmarks/mock_server.py --port 8080``.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import secrets
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from aiohttp import web
+
+AUTH_PATH = "/auth/realms/logwien/protocol/openid-connect/"
+LOGIN_ACTION_PATH = "/auth/realms/logwien/login-actions/authenticate"
+CONFIG_PATH = "/assets/app-config.json"
+API_PATH = "/gateway/WN_SMART_METER_PORTAL_API_B2C/1.0/"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="de"><head><title>Anmeldung bei log.wien</title></head>
+<body><div id="kc-content"><div id="kc-form-wrapper">
+<form id="kc-form-login" onsubmit="login.disabled = true; return true;"
+ action="{action}" method="post">
+<input tabindex="1" id="username" name="username" type="text" autofocus>
+<input tabindex="2" id="password" name="password" type="password">
+<input tabindex="4" name="login" id="kc-login" type="submit" value="Anmelden">
+</form></div></div></body></html>
+"""
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server."""
+
+    meters: int = 1
+    # seconds added to every response
+    latency: float = 0.0
+    # share of API requests that fail with a 503
+    error_rate: float = 0.0
+    # interval length of verbrauch values, None to follow dayViewResolution
+    resolution_minutes: int | None = None
+    access_token_lifetime: int = 300
+    refresh_token_lifetime: int = 1800
+    username: str = "user@example.com"
+    password: str = "secret"
+    seed: int = 0
+
+
+def meter_reader(index: int) -> str:
+    """Return the meter reader number of the meter with an index."""
+    return f"AT00100000000000000000000{index:07d}"
+
+
+def customer_id(index: int) -> str:
+    """Return the customer id of the meter with an index, 10 meters per customer."""
+    return f"{1200000000 + index // 10}"
+
+
+def _api_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _value(timestamp: datetime, minutes: int) -> int:
+    """Return a repeatable consumption in Wh of an interval."""
+    return (int(timestamp.timestamp()) // 60 % 997 + 50) * minutes // 60
+
+
+class MockWienerNetze:
+    """The mock server and its request counters."""
+
+    def __init__(self, config: MockConfig | None = None) -> None:
+        """Initialize the server."""
+        self.config = config or MockConfig()
+        self.requests: Counter[str] = Counter()
+        self._random = random.Random(self.config.seed)
+        self._codes: set[str] = set()
+        self._access_tokens: set[str] = set()
+        self._refresh_tokens: set[str] = set()
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes(
+            [
+                web.get(AUTH_PATH + "auth", self.login_page, name="login_page"),
+                web.post(LOGIN_ACTION_PATH, self.authenticate, name="authenticate"),
+                web.post(AUTH_PATH + "token", self.token, name="token"),
+                web.get(CONFIG_PATH, self.app_config, name="app_config"),
+                web.get(API_PATH + "zaehlpunkte", self.zaehlpunkte, name="zaehlpunkte"),
+                web.get(
+                    API_PATH + "zaehlpunkt/meterReadings",
+                    self.meter_readings,
+                    name="meter_readings",
+                ),
+                web.get(
+                    API_PATH + "zaehlpunkt/consumptions",
+                    self.consumptions,
+                    name="consumptions",
+                ),
+                web.put(
+                    API_PATH + "kundennummer/{customer_id}/zaehlpunkt/default",
+                    self.set_default,
+                    name="set_default",
+                ),
+                web.get(
+                    API_PATH + "messdaten/{customer_id}/{meter_reader}/verbrauch",
+                    self.verbrauch,
+                    name="verbrauch",
+                ),
+                web.get(
+                    API_PATH + "zaehlpunkte/{customer_id}/{meter_reader}/messwerte",
+                    self.messwerte,
+                    name="messwerte",
+                ),
+            ]
+        )
+        self.default_meter = meter_reader(0)
+
+    @property
+    def total_requests(self) -> int:
+        """Return the number of requests since the last reset."""
+        return sum(self.requests.values())
+
+    def reset(self) -> None:
+        """Reset the request counters."""
+        self.requests.clear()
+
+    def expire_tokens(self) -> None:
+        """Make every issued access token invalid."""
+        self._access_tokens.clear()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        name = request.match_info.route.name or "unknown"
+        self.requests[name] += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        if request.path.startswith(API_PATH):
+            token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if token not in self._access_tokens:
+                raise web.HTTPUnauthorized()
+            if self._random.random() < self.config.error_rate:
+                raise web.HTTPServiceUnavailable(headers={"Retry-After": "0"})
+        return await handler(request)
+
+    def _meters(self) -> list[tuple[str, str]]:
+        return [(meter_reader(index), customer_id(index)) for index in range(self.config.meters)]
+
+    async def login_page(self, request: web.Request) -> web.Response:
+        """Return the Keycloak login form."""
+        action = request.url.with_path(LOGIN_ACTION_PATH).with_query(
+            session_code=secrets.token_urlsafe(16), client_id="wn-smartmeter"
+        )
+        return web.Response(
+            text=LOGIN_PAGE.format(action=str(action).replace("&", "&amp;")),
+            content_type="text/html",
+        )
+
+    async def authenticate(self, request: web.Request) -> web.Response:
+        """Check the credentials and redirect with an authorization code."""
+        form = await request.post()
+        if (form.get("username"), form.get("password")) != (
+            self.config.username,
+            self.config.password,
+        ):
+            return web.Response(status=200, text="Invalid username or password.")
+        code = secrets.token_urlsafe(16)
+        self._codes.add(code)
+        location = f"https://smartmeter-web.wienernetze.at/#state=x&session_state=y&code={code}"
+        return web.Response(status=302, headers={"Location": location})
+
+    async def token(self, request: web.Request) -> web.Response:
+        """Issue tokens for an authorization code or a refresh token."""
+        form = await request.post()
+        if form.get("grant_type") == "authorization_code":
+            if form.get("code") not in self._codes:
+                return web.json_response({"error": "invalid_grant"}, status=400)
+            self._codes.discard(form["code"])
+        elif form.get("grant_type") == "refresh_token":
+            if form.get("refresh_token") not in self._refresh_tokens:
+                return web.json_response({"error": "invalid_grant"}, status=400)
+        else:
+            return web.json_response({"error": "unsupported_grant_type"}, status=400)
+        access_token = secrets.token_urlsafe(32)
+        refresh_token = secrets.token_urlsafe(32)
+        self._access_tokens.add(access_token)
+        self._refresh_tokens.add(refresh_token)
+        return web.json_response(
+            {
+                "access_token": access_token,
+                "expires_in": self.config.access_token_lifetime,
+                "refresh_expires_in": self.config.refresh_token_lifetime,
+                "refresh_token": refresh_token,
+                "token_type": "Bearer",
+                "id_token": secrets.token_urlsafe(32),
+                "not-before-policy": 0,
+                "session_state": "y",
+                "scope": "openid email profile",
+            }
+        )
+
+    async def app_config(self, request: web.Request) -> web.Response:
+        """Return the web app configuration with the gateway api key."""
+        return web.json_response({"b2cApiKey": "mock-api-key", "b2bApiKey": "mock"})
+
+    async def zaehlpunkte(self, request: web.Request) -> web.Response:
+        """Return the meters grouped by business partner."""
+        partners: dict[str, list[dict]] = {}
+        for meter, customer in self._meters():
+            partners.setdefault(customer, []).append(
+                {
+                    "zaehlpunktnummer": meter,
+                    "customLabel": None,
+                    "equipmentNumber": "1234567",
+                    "geraetNumber": "ABC123",
+                    "isSmartMeter": True,
+                    "isDefault": meter == self.default_meter,
+                    "isActive": True,
+                    "verbrauchsstelle": {"strasse": "Musterstraße", "plz": "1010", "ort": "Wien"},
+                    "anlage": {"typ": "TAGSTROM"},
+                }
+            )
+        return web.json_response(
+            [
+                {"bezeichnung": "Max Muster", "geschaeftspartner": customer, "zaehlpunkte": meters}
+                for customer, meters in partners.items()
+            ]
+        )
+
+    async def meter_readings(self, request: web.Request) -> web.Response:
+        """Return the latest reading of the default meter."""
+        return web.json_response(
+            {"meterReadings": [{"value": 12345678, "date": _api_date(datetime.now(timezone.utc))}]}
+        )
+
+    async def consumptions(self, request: web.Request) -> web.Response:
+        """Return the consumption of the last two days of the default meter."""
+        return web.json_response(
+            {
+                "consumptionYesterday": {"value": 8123},
+                "consumptionDayBeforeYesterday": {"value": 7456},
+            }
+        )
+
+    async def set_default(self, request: web.Request) -> web.Response:
+        """Change the default meter."""
+        self.default_meter = (await request.json())["zaehlpunktNummer"]
+        return web.json_response({})
+
+    async def verbrauch(self, request: web.Request) -> web.Response:
+        """Return the consumption values of a meter between two points in time."""
+        start = datetime.fromisoformat(request.query["dateFrom"])
+        end = min(datetime.fromisoformat(request.query["dateTo"]), datetime.now(timezone.utc))
+        minutes = self.config.resolution_minutes or (
+            15 if request.query.get("dayViewResolution") == "QUARTER-HOUR" else 60
+        )
+        step = timedelta(minutes=minutes)
+        start -= timedelta(seconds=start.timestamp() % step.total_seconds())
+        values = []
+        while start + step <= end:
+            values.append(
+                {
+                    "wert": _value(start, minutes),
+                    "zeitpunktVon": _api_date(start),
+                    "zeitpunktBis": _api_date(start + step),
+                    "geschaetzt": False,
+                }
+            )
+            start += step
+        return web.json_response(
+            {
+                "quarter-hour-opt-in": True,
+                "zaehlpunkt": request.match_info["meter_reader"],
+                "values": values,
+                "statistics": {"maximum": 1046, "minimum": 50, "average": 548},
+            }
+        )
+
+    async def messwerte(self, request: web.Request) -> web.Response:
+        """Return the daily values or meter readings of a meter."""
+        day = date.fromisoformat(request.query["datumVon"])
+        last = date.fromisoformat(request.query["datumBis"])
+        meter_read = request.query.get("wertetyp") == "METER_READ"
+        messwerte = []
+        while day < last:
+            start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            messwerte.append(
+                {
+                    "messwert": 12000000 + day.toordinal() % 1000 * 8000
+                    if meter_read
+                    else 8000 + day.toordinal() % 7 * 250,
+                    "zeitVon": _api_date(start),
+                    "zeitBis": _api_date(start + timedelta(days=1)),
+                    "qualitaet": "VAL",
+                }
+            )
+            day += timedelta(days=1)
+        return web.json_response(
+            {
+                "zaehlpunkt": request.match_info["meter_reader"],
+                "zaehlwerke": [{"obisCode": "1-1:1.8.0", "einheit": "WH", "messwerte": messwerte}],
+            }
+        )
+
+
+def main() -> None:
+    """Serve the mock until it is interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--meters", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--resolution-minutes", type=int)
+    args = parser.parse_args()
+    server = MockWienerNetze(
+        MockConfig(
+            meters=args.meters,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            resolution_minutes=args.resolution_minutes,
+        )
+    )
+    web.run_app(server.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
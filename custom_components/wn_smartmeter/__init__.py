@@ -6,24 +6,38 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
 from .coordinator import WienerNetzeUpdateCoordinator
+from .services import async_setup_services
 
 from .const import DOMAIN
-from .const import CONF_METER_READER, CONF_SCAN_INTERVAL
+from .const import CONF_USERNAME, CONF_PASSWORD, CONF_METER_READER, CONF_SCAN_INTERVAL
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     """Set up this integration using UI."""
-    coordinator: WienerNetzeUpdateCoordinator = WienerNetzeUpdateCoordinator(
-        hass, config_entry
+    coordinators: dict[str, WienerNetzeUpdateCoordinator] = hass.data.setdefault(
+        DOMAIN, {}
     )
-    await coordinator.async_config_entry_first_refresh()
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN] = coordinator
+    coordinator = _get_account_coordinator(hass, config_entry.data[CONF_USERNAME])
+    if coordinator is None:
+        coordinator = WienerNetzeUpdateCoordinator(
+            hass, config_entry.data[CONF_USERNAME], config_entry.data[CONF_PASSWORD]
+        )
+    coordinator.add_meter(config_entry)
+    # register right away so entries set up concurrently share the account
+    coordinators[config_entry.entry_id] = coordinator
 
+    # entities start with their restored state, the login and first refresh
+    # run in the background so startup does not wait on log.wien
     await hass.config_entries.async_forward_entry_setups(config_entry, ["sensor"])
+    config_entry.async_create_background_task(
+        hass,
+        coordinator.async_first_refresh_meter(config_entry.data[CONF_METER_READER]),
+        f"{DOMAIN} first refresh {config_entry.entry_id}",
+    )
     config_entry.async_on_unload(config_entry.add_update_listener(update_listener))
+    await async_setup_services(hass)
     return True
 
 
@@ -32,11 +46,26 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     if unloaded := await hass.config_entries.async_unload_platforms(
         config_entry, ["sensor"]
     ):
-        del hass.data[DOMAIN]
+        coordinator: WienerNetzeUpdateCoordinator = hass.data[DOMAIN].pop(
+            config_entry.entry_id
+        )
+        coordinator.remove_meter(config_entry)
+        if not coordinator.meters:
+            await coordinator.wienernetze_api.async_close()
 
     return unloaded
 
 
+def _get_account_coordinator(
+    hass: HomeAssistant, username: str
+) -> WienerNetzeUpdateCoordinator | None:
+    """Return the coordinator already serving an account."""
+    for coordinator in hass.data[DOMAIN].values():
+        if coordinator.username == username:
+            return coordinator
+    return None
+
+
 async def update_listener(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """Update listener."""
     _LOGGER.debug("update_listener()")
@@ -0,0 +1,112 @@
+"""Derived consumption values of a meter's interval series."""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+
+from homeassistant.util import dt as dt_util
+
+from .series import IntervalSeries
+from .const import (
+    AGGREGATE_AVERAGE_DAYS,
+    AGGREGATE_NIGHT_DAYS,
+    AGGREGATE_NIGHT_HOURS,
+    ATTR_CONSUMPTION_WEEK_TO_DATE,
+    ATTR_CONSUMPTION_MONTH_TO_DATE,
+    ATTR_CONSUMPTION_DAILY_AVERAGE,
+    ATTR_PEAK_HOUR_CONSUMPTION,
+    ATTR_NIGHT_BASE_LOAD,
+)
+
+# numpy is optional and only imported by the first computation
+_HAS_NUMPY = find_spec("numpy") is not None
+
+
+def _values(series: IntervalSeries, start: datetime, end: datetime):
+    """Return the values in [start, end) as a vector, without copying with numpy."""
+    low, high = series.bounds(int(start.timestamp()), int(end.timestamp()))
+    if _HAS_NUMPY:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        # temporary view, it must not outlive the call so the array can grow
+        return np.frombuffer(series.values, dtype=np.float64)[low:high]
+    return series.values[low:high]
+
+
+def _sum(values) -> float:
+    if _HAS_NUMPY:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return float(np.sum(values))
+    return sum(values)
+
+
+def _max(values) -> float:
+    if _HAS_NUMPY:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return float(np.max(values))
+    return max(values)
+
+
+def compute_aggregates(series: IntervalSeries, now: datetime) -> dict[str, float]:
+    """Compute the derived values of a series, leaving out those without data."""
+    if not len(series):
+        return {}
+    today = now.date()
+    start_of_today = dt_util.start_of_local_day(today)
+    week_start = dt_util.start_of_local_day(today - timedelta(days=today.weekday()))
+    month_start = dt_util.start_of_local_day(today.replace(day=1))
+    average_start = dt_util.start_of_local_day(
+        today - timedelta(days=AGGREGATE_AVERAGE_DAYS)
+    )
+    aggregates: dict[str, float] = {}
+
+    aggregates[ATTR_CONSUMPTION_WEEK_TO_DATE] = _sum(_values(series, week_start, now))
+    aggregates[ATTR_CONSUMPTION_MONTH_TO_DATE] = _sum(_values(series, month_start, now))
+
+    # days before the first interval are not counted as zero consumption
+    covered_start = max(average_start, dt_util.utc_from_timestamp(series.first_timestamp))
+    covered_days = -(-(start_of_today - covered_start).total_seconds() // 86400)
+    if covered_days > 0:
+        aggregates[ATTR_CONSUMPTION_DAILY_AVERAGE] = (
+            _sum(_values(series, average_start, start_of_today)) / covered_days
+        )
+
+    recent = _values(series, average_start, now)
+    if len(recent):
+        aggregates[ATTR_PEAK_HOUR_CONSUMPTION] = _max(recent)
+
+    night_loads = []
+    for days_back in range(1, AGGREGATE_NIGHT_DAYS + 1):
+        night = today - timedelta(days=days_back)
+        values = _values(
+            series,
+            dt_util.start_of_local_day(night) + timedelta(hours=AGGREGATE_NIGHT_HOURS[0]),
+            dt_util.start_of_local_day(night) + timedelta(hours=AGGREGATE_NIGHT_HOURS[1]),
+        )
+        if len(values):
+            night_loads.append(_sum(values) / len(values))
+    if night_loads:
+        # kWh per interval to average kW
+        aggregates[ATTR_NIGHT_BASE_LOAD] = (
+            sum(night_loads) / len(night_loads) * 3600 / series.resolution
+        )
+    return aggregates
+
+
+class AggregateEngine:
+    """Keeps the derived values of a series until it or the day changes."""
+
+    def __init__(self, series: IntervalSeries) -> None:
+        """Initialize the engine."""
+        self.series = series
+        self._key = None
+        self._aggregates: dict[str, float] = {}
+
+    def compute(self, now: datetime) -> dict[str, float]:
+        """Return the derived values, computing them in one pass if needed."""
+        key = (self.series.version, now.date())
+        if key != self._key:
+            self._aggregates = compute_aggregates(self.series, now)
+            self._key = key
+        return self._aggregates
@@ -1,15 +1,20 @@
 """Unofficial Python wrapper for the Wiener Netze Smart Meter private API."""
-try:
-    from importlib.metadata import version
-except ModuleNotFoundError:
-    from importlib_metadata import version
+from .client import CircuitOpenError, WienerNetzeAPI
+from .models import MalformedResponseError
+from .shared import get_api
 
+__all__ = ["CircuitOpenError", "MalformedResponseError", "WienerNetzeAPI", "get_api"]
 
-from contextlib import suppress
 
-from .client import WienerNetzeAPI
-
-with suppress(Exception):
-    __version__ = version(__name__)
-
-__all__ = ["WienerNetzeAPI"]
+def __getattr__(name):
+    """Look up the package version only when it is asked for."""
+    if name != "__version__":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ModuleNotFoundError:
+        from importlib_metadata import version, PackageNotFoundError
+    try:
+        return version(__name__)
+    except PackageNotFoundError as err:
+        raise AttributeError(name) from err
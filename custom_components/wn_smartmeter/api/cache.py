@@ -0,0 +1,75 @@
+"""Persistent response cache for the WienerNetze API."""
+from __future__ import annotations
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from ..const import CACHE_STORAGE_VERSION, CACHE_MAX_ENTRIES, CACHE_SAVE_DELAY
+
+
+class ResponseCache:
+    """LRU cache of API responses that is persisted with a HA store.
+
+    Entries without an expiry are kept until they are evicted by newer
+    entries, entries with an expiry are dropped once it has passed, before
+    any entry is evicted.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, key: str, max_entries: int = CACHE_MAX_ENTRIES
+    ) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(hass, CACHE_STORAGE_VERSION, key)
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load the persisted entries once."""
+        if self._loaded:
+            return
+        self._loaded = True
+        data = await self._store.async_load() or {}
+        now = datetime.now().timestamp()
+        for key, entry in data.get("entries", {}).items():
+            if entry["expires"] is None or entry["expires"] > now:
+                self._entries[key] = entry
+        self._evict()
+
+    def get(self, key: str) -> Any | None:
+        """Return a cached response or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires"] is not None and entry["expires"] <= datetime.now().timestamp():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry["value"]
+
+    def set(self, key: str, value: Any, expires: datetime | None) -> None:
+        """Cache a response until expires, or until it is evicted if expires is None."""
+        self._entries[key] = {
+            "expires": expires.timestamp() if expires is not None else None,
+            "value": value,
+        }
+        self._entries.move_to_end(key)
+        self._evict()
+        self._store.async_delay_save(self._data_to_save, CACHE_SAVE_DELAY)
+
+    def _evict(self) -> None:
+        now = datetime.now().timestamp()
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if entry["expires"] is not None and entry["expires"] <= now
+        ]:
+            del self._entries[key]
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"entries": dict(self._entries)}
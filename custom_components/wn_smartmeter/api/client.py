@@ -1,29 +1,288 @@
 """WienerNetze API that provides data from the SmartMeter API."""
+from __future__ import annotations
+import asyncio
+import base64
+import hashlib
+import json
 import logging
+import random
+import time
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager, nullcontext
+from email.utils import parsedate_to_datetime
 from urllib import parse
 from datetime import timedelta
 from datetime import datetime
+from datetime import timezone
+from typing import Any
 from aiohttp import hdrs
-from lxml import html
-from homeassistant.helpers.aiohttp_client import (
-    async_create_clientsession,
-)
+from cryptography.fernet import Fernet, InvalidToken
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
 import aiohttp
+from .cache import ResponseCache
+from .login_form import extract_form_action
+from .metrics import Metrics
+from .scheduler import FleetScheduler
+from .models import loads
 from ..const import (
+    API_GATEWAY_TOKEN_REGEX,
     AUTH_URL,
+    AUTH_COOKIE_DOMAIN,
     LOGIN_ARGS,
     API_DATE_FORMAT,
+    API_DAY_FORMAT,
     API_URL,
     API_TIMEOUT,
+    API_CONNECTION_LIMIT,
+    API_KEEPALIVE_TIMEOUT,
     API_CONFIG_URL,
+    TOKEN_REFRESH_MARGIN,
+    DOMAIN,
+    CACHE_OPEN_TTL,
+    CACHE_FINALIZED_DAYS,
+    VALIDATOR_MAX_ENTRIES,
+    API_RATE_LIMIT,
+    API_RATE_BURST,
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    PARSE_EXECUTOR_THRESHOLD,
+    TOKEN_STORAGE_VERSION,
+    TOKEN_KEY_ITERATIONS,
+    METADATA_TTL,
     build_access_token_args,
+    build_refresh_token_args,
 )
 
 _LOGGER = logging.getLogger(__name__)
 timeout = aiohttp.ClientTimeout(total=API_TIMEOUT)
 
 
+class CircuitOpenError(ConnectionError):
+    """Raised while the circuit breaker keeps requests away from the gateway."""
+
+
+def _is_retryable(err: Exception) -> bool:
+    """Return true for errors worth another attempt."""
+    if isinstance(err, aiohttp.ClientResponseError):
+        return err.status == 429 or err.status >= 500
+    return isinstance(err, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+def _retry_after(err: Exception) -> float | None:
+    """Return the seconds a Retry-After header asks to wait."""
+    headers = getattr(err, "headers", None)
+    if not headers or hdrs.RETRY_AFTER not in headers:
+        return None
+    value = headers[hdrs.RETRY_AFTER]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _fill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            self._fill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._fill()
+            self.tokens -= 1
+
+    def as_dict(self) -> dict:
+        """Return the limiter state."""
+        self._fill()
+        return {"rate": self.rate, "capacity": self.capacity, "tokens": self.tokens}
+
+
+class CircuitBreaker:
+    """Stops calls after repeated failures and lets a single trial call through later.
+
+    While the trial call is in flight the circuit stays closed to all other
+    calls. A trial call that never reports back is given up after the reset
+    timeout, so the next call can try again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Initialize a closed circuit."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing_since = None
+
+    @property
+    def state(self) -> str:
+        """Return closed, open or half_open."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return true if a call may be made, once while the circuit is half open."""
+        state = self.state
+        if state != "half_open":
+            return state == "closed"
+        now = time.monotonic()
+        if self.probing_since is not None and now - self.probing_since < self.reset_timeout:
+            return False
+        self.probing_since = now
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self.opened_at = None
+        self.probing_since = None
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit at the threshold."""
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+        self.probing_since = None
+
+    def release(self) -> None:
+        """End a trial call that says nothing about the gateway, the next call tries."""
+        self.probing_since = None
+
+    def as_dict(self) -> dict:
+        """Return the breaker state."""
+        return {"state": self.state, "failures": self.failures}
+
+
+class TokenManager:
+    """Keeps track of the access and refresh token lifetimes."""
+
+    def __init__(self) -> None:
+        """Initialize an empty token state."""
+        self.access_token = None
+        self.refresh_token = None
+        self.access_expires = None
+        self.refresh_expires = None
+
+    def update(self, token_response: dict) -> None:
+        """Store the tokens of a token endpoint response."""
+        now = datetime.now()
+        self.access_token = token_response["access_token"]
+        self.refresh_token = token_response["refresh_token"]
+        self.access_expires = now + timedelta(
+            seconds=token_response.get("expires_in", 0)
+        )
+        # keycloak reports 0 for refresh tokens without an idle timeout
+        refresh_expires_in = token_response.get("refresh_expires_in", 0)
+        self.refresh_expires = (
+            now + timedelta(seconds=refresh_expires_in) if refresh_expires_in else None
+        )
+
+    def clear(self) -> None:
+        """Forget all tokens."""
+        self.access_token = None
+        self.refresh_token = None
+        self.access_expires = None
+        self.refresh_expires = None
+
+    def as_dict(self) -> dict:
+        """Return the tokens for persisting them."""
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "access_expires": _isoformat(self.access_expires),
+            "refresh_expires": _isoformat(self.refresh_expires),
+        }
+
+    def restore(self, data: dict) -> None:
+        """Restore persisted tokens."""
+        self.access_token = data["access_token"]
+        self.refresh_token = data["refresh_token"]
+        self.access_expires = _fromisoformat(data["access_expires"])
+        self.refresh_expires = _fromisoformat(data["refresh_expires"])
+
+    @property
+    def access_token_valid(self) -> bool:
+        """Return true if the access token can still be used."""
+        return self.access_token is not None and datetime.now() < (
+            self.access_expires - timedelta(seconds=TOKEN_REFRESH_MARGIN)
+        )
+
+    @property
+    def refresh_token_valid(self) -> bool:
+        """Return true if the refresh token can still be used."""
+        if self.refresh_token is None:
+            return False
+        if self.refresh_expires is None:
+            return True
+        return datetime.now() < (
+            self.refresh_expires - timedelta(seconds=TOKEN_REFRESH_MARGIN)
+        )
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _fromisoformat(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+class MetadataCache:
+    """Account values that rarely change, kept with the time they were fetched."""
+
+    def __init__(self, ttl: float = METADATA_TTL) -> None:
+        """Initialize an empty cache."""
+        self.ttl = ttl
+        self._entries: dict[str, dict[str, Any]] = {}
+
+    def get(self, key: str) -> tuple[Any, bool]:
+        """Return a value or None and whether it is still fresh."""
+        if (entry := self._entries.get(key)) is None:
+            return None, False
+        return entry["value"], time.time() - entry["fetched"] < self.ttl
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value."""
+        self._entries[key] = {"value": value, "fetched": time.time()}
+
+    def invalidate(self) -> None:
+        """Forget all values."""
+        self._entries.clear()
+
+    def as_dict(self) -> dict:
+        """Return the entries for persisting them."""
+        return dict(self._entries)
+
+    def restore(self, data: dict) -> None:
+        """Restore persisted entries."""
+        self._entries.update(data)
+
+
 class WienerNetzeAPI:
     """WienerNetze API Client."""
 
@@ -33,53 +292,276 @@ class WienerNetzeAPI:
         username: str,
         password: str,
         meter_reader: str = "",
+        scheduler: FleetScheduler | None = None,
     ) -> None:
-        """Access the Smartmeter API."""
+        """Access the Smartmeter API, within the limits of scheduler if given."""
         self.hass = hass
+        self.scheduler = scheduler
         self.username = username
         self.password = password
         self.meter_reader = meter_reader
         self.session = None
         self.lastlogin = None
-        self._access_token = None
-        self._refresh_token = None
+        self._tokens = TokenManager()
         self._api_gateway_token = None
+        self._cache = ResponseCache(hass, f"{DOMAIN}.{slugify(username)}_cache")
+        # url -> etag, last modified, body digest and the decoded response
+        self._validators: OrderedDict[str, dict] = OrderedDict()
+        self.limiter = TokenBucket(API_RATE_LIMIT, API_RATE_BURST)
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.retries = 0
+        self.metrics = Metrics()
+        # tokens and metadata persisted encrypted with a key derived from the password
+        self._store: Store[dict[str, str]] = Store(
+            hass, TOKEN_STORAGE_VERSION, f"{DOMAIN}.{slugify(username)}_tokens"
+        )
+        self._fernet: tuple[str, Fernet] | None = None
+        self._restored = False
+        self._metadata = MetadataCache()
+        self._revalidating: dict[str, asyncio.Task] = {}
+
+    def diagnostics(self) -> dict:
+        """Return the rate limiter, circuit breaker and timing of the client."""
+        return {
+            "limiter": self.limiter.as_dict(),
+            "breaker": self.breaker.as_dict(),
+            "retries": self.retries,
+            "metrics": self.metrics.as_dict(),
+        }
+
+    async def _with_retries(self, func, *args, **kwargs):
+        """Call func, retrying transient errors with decorrelated jitter."""
+        delay = RETRY_BASE_DELAY
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as err:  # pylint: disable=broad-except
+                if not _is_retryable(err):
+                    self.breaker.release()
+                    raise
+                if attempt == RETRY_ATTEMPTS - 1:
+                    self.breaker.record_failure()
+                    raise
+                delay = min(RETRY_MAX_DELAY, random.uniform(RETRY_BASE_DELAY, delay * 3))
+                wait = min(RETRY_MAX_DELAY, max(delay, _retry_after(err) or 0))
+                _LOGGER.debug("retrying in %.1fs after: %s", wait, err)
+                self.retries += 1
+                await asyncio.sleep(wait)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _parse(self, phase: str, parser, body):
+        """Parse a body, large ones in the executor to keep the event loop free.
+
+        The parse time is recorded per phase, split by where it ran, so the
+        threshold can be tuned from the diagnostics.
+        """
+        offloaded = len(body) >= PARSE_EXECUTOR_THRESHOLD
+        start = time.perf_counter()
+        if offloaded:
+            result = await self.hass.async_add_executor_job(parser, body)
+        else:
+            result = parser(body)
+        seconds = time.perf_counter() - start
+        self.metrics.record_parse(phase, seconds, len(body), offloaded)
+        _LOGGER.debug(
+            "parsed %d bytes of %s in %.1f ms%s",
+            len(body),
+            phase,
+            seconds * 1000,
+            " in the executor" if offloaded else "",
+        )
+        return result
+
+    def _gate(self, gate: str) -> AbstractAsyncContextManager:
+        """Return a slot of a domain wide gate, no limit without a scheduler."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.acquire(gate)
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """Create the session on first use and keep it for the client lifetime."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=API_CONNECTION_LIMIT,
+                keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+                ssl=False,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, cookie_jar=aiohttp.CookieJar()
+            )
+        return self.session
+
+    async def async_close(self) -> None:
+        """Close the session and its connections, the tokens stay usable."""
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def _async_fernet(self) -> Fernet:
+        """Return the cipher of the persisted state, derived from the credentials."""
+        if self._fernet is None or self._fernet[0] != self.password:
+            key = await self.hass.async_add_executor_job(
+                hashlib.pbkdf2_hmac,
+                "sha256",
+                self.password.encode(),
+                self.username.encode(),
+                TOKEN_KEY_ITERATIONS,
+            )
+            self._fernet = (self.password, Fernet(base64.urlsafe_b64encode(key)))
+        return self._fernet[1]
+
+    async def _async_restore(self) -> None:
+        """Load the persisted tokens and metadata once."""
+        if self._restored:
+            return
+        self._restored = True
+        if (data := await self._store.async_load()) is None:
+            return
+        fernet = await self._async_fernet()
+        try:
+            state = json.loads(fernet.decrypt(data["data"].encode()))
+        except (InvalidToken, KeyError, ValueError):
+            # written with another password
+            _LOGGER.debug("Persisted tokens can not be read")
+            return
+        if self._tokens.refresh_token is None:
+            self._tokens.restore(state["tokens"])
+        for key, entry in state["metadata"].items():
+            if self._metadata.get(key)[0] is None:
+                self._metadata.restore({key: entry})
+        if self._api_gateway_token is None:
+            self._api_gateway_token = self._metadata.get("api_key")[0]
+
+    async def _async_persist(self) -> None:
+        """Save the tokens and metadata encrypted."""
+        fernet = await self._async_fernet()
+        state = {"tokens": self._tokens.as_dict(), "metadata": self._metadata.as_dict()}
+        await self._store.async_save(
+            {"data": fernet.encrypt(json.dumps(state).encode()).decode()}
+        )
+
+    async def _cached_metadata(self, key: str, fetch) -> Any:
+        """Return a metadata value, fetching it only when it is missing.
+
+        Values older than the TTL are returned right away and revalidated
+        in the background.
+        """
+        await self._async_restore()
+        value, fresh = self._metadata.get(key)
+        if value is None:
+            value = await fetch()
+            self._metadata.set(key, value)
+            await self._async_persist()
+        elif not fresh and key not in self._revalidating:
+            self._revalidating[key] = self.hass.async_create_background_task(
+                self._async_revalidate(key, fetch), f"{DOMAIN} revalidate {key}"
+            )
+        return value
+
+    async def _async_revalidate(self, key: str, fetch) -> None:
+        try:
+            self._metadata.set(key, await fetch())
+            await self._async_persist()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Could not revalidate %s: %s", key, err)
+        finally:
+            self._revalidating.pop(key, None)
+
+    def _invalidate_auth(self) -> None:
+        """Forget the access token, api key and metadata after a rejected request."""
+        self._tokens.access_token = None
+        self._api_gateway_token = None
+        self._metadata.invalidate()
 
     async def _get_login_url(self) -> str:
         """Get login url."""
         login_url = AUTH_URL + "auth?" + parse.urlencode(LOGIN_ARGS)
 
-        async with self.session.get(url=login_url, timeout=timeout) as resp:
-            status_code = int(resp.status)
-            body = await resp.text()
-
-            if status_code != 200:
-                raise ConnectionError(
-                    f"Could not load login page. Error: status:{status_code} body:{body}"
-                ) from Exception
+        with self.metrics.measure("login_page"):
+            async with self._ensure_session().get(url=login_url, timeout=timeout) as resp:
+                status_code = int(resp.status)
+                body = await resp.text()
 
-            tree = html.fromstring(body)
-            loginurl = tree.xpath("(//form/@action)")
+                if status_code != 200:
+                    raise ConnectionError(
+                        f"Could not load login page. Error: status:{status_code} body:{body}"
+                    ) from Exception
 
-            return loginurl[0]
+        return await self._parse("login_page", extract_form_action, body)
 
     async def _set_tokens(self, code: str):
         """Get tokens."""
-        async with self.session.post(
-            url=AUTH_URL + "token",
-            data=build_access_token_args(code=code),
-            allow_redirects=False,
-            timeout=timeout,
-        ) as resp:
-            json = await resp.json()
-            self._access_token = json["access_token"]
-            self._refresh_token = json["refresh_token"]
-            self._api_gateway_token = await self._get_api_key(self._access_token)
+        with self.metrics.measure("token"):
+            async with self._ensure_session().post(
+                url=AUTH_URL + "token",
+                data=build_access_token_args(code=code),
+                allow_redirects=False,
+                timeout=timeout,
+            ) as resp:
+                token_response = await resp.json()
+                self._tokens.update(token_response)
+        self._api_gateway_token = await self._get_api_key(self._tokens.access_token)
+        await self._async_persist()
+
+    async def _refresh_tokens(self):
+        """Get new tokens with the refresh token."""
+        _LOGGER.debug("_refresh_tokens()")
+        with self.metrics.measure("refresh_token"):
+            # restored tokens are refreshed before anything opened a session
+            async with self._ensure_session().post(
+                url=AUTH_URL + "token",
+                data=build_refresh_token_args(refresh_token=self._tokens.refresh_token),
+                allow_redirects=False,
+                timeout=timeout,
+            ) as resp:
+                if resp.status != 200:
+                    raise ConnectionError(
+                        f"Could not refresh token. Error: status:{resp.status}"
+                    )
+                token_response = await resp.json()
+                self._tokens.update(token_response)
+        if self._api_gateway_token is None:
+            self._api_gateway_token = await self._get_api_key(self._tokens.access_token)
+        await self._async_persist()
+
+    async def ensure_login(self) -> bool:
+        """Reuse or refresh the current tokens and only login if that fails.
+
+        Raises CircuitOpenError while the circuit breaker is open.
+        """
+        await self._async_restore()
+        if self._tokens.access_token_valid and self._api_gateway_token is not None:
+            return True
+        if not self.breaker.allow():
+            raise CircuitOpenError("WienerNetze circuit breaker is open")
+        if self._tokens.refresh_token_valid:
+            try:
+                async with self._gate("login"):
+                    await self._refresh_tokens()
+                self.breaker.record_success()
+                return True
+            except (aiohttp.ClientError, ConnectionError, KeyError) as err:
+                _LOGGER.debug("Token refresh failed, login again: %s", err)
+        self._tokens.clear()
+        return await self._with_retries(self.login)
 
     async def login(self) -> bool:
         """login."""
+        # wait on this account's limiter before holding a domain wide slot
+        await self.limiter.acquire()
+        async with self._gate("login"):
+            return await self._login()
+
+    async def _login(self) -> bool:
+        """Run the login flow."""
         _LOGGER.debug("login()")
-        self.session = async_create_clientsession(self.hass, verify_ssl=False)
+        session = self._ensure_session()
+        # start the auth flow without cookies of a previous keycloak session
+        session.cookie_jar.clear_domain(AUTH_COOKIE_DOMAIN)
         self.lastlogin = datetime.now()
         login_url = await self._get_login_url()
 
@@ -88,10 +570,11 @@ class WienerNetzeAPI:
                 "username": self.username,
                 "password": self.password,
             }
-            async with self.session.post(
-                url=login_url, data=data, allow_redirects=False, timeout=timeout
-            ) as resp:
-                headers = resp.headers
+            with self.metrics.measure("credentials"):
+                async with session.post(
+                    url=login_url, data=data, allow_redirects=False, timeout=timeout
+                ) as resp:
+                    headers = resp.headers
 
             if "Location" not in headers:
                 return False
@@ -116,14 +599,27 @@ class WienerNetzeAPI:
             return True
 
     async def _get_api_key(self, token) -> str:
-        """Get api key."""
+        """Get api key, from the metadata cache when it is known."""
+        return await self._cached_metadata("api_key", lambda: self._fetch_api_key(token))
+
+    async def _fetch_api_key(self, token) -> str:
+        """Fetch the api key from the app config of the web app."""
         headers = {"Authorization": f"Bearer {token}"}
-        async with self.session.get(
-            url=API_CONFIG_URL, headers=headers
-        ) as resp:
-            body = await resp.json()
+        with self.metrics.measure("api_key"):
+            async with self._ensure_session().get(
+                url=API_CONFIG_URL, headers=headers
+            ) as resp:
+                resp.raise_for_status()
+                body = await resp.text()
 
-        return body["b2cApiKey"]
+        try:
+            return json.loads(body)["b2cApiKey"]
+        except (ValueError, KeyError, TypeError):
+            pass
+        # older versions of the web app inline the key in a script
+        if (match := API_GATEWAY_TOKEN_REGEX.search(body)) is not None:
+            return match.group(1)
+        raise ConnectionError("No b2cApiKey in the app config")
 
     async def _call_api(
         self,
@@ -132,9 +628,22 @@ class WienerNetzeAPI:
         query=None,
         method="GET",
         data=None,
-        timeout=60.0
+        timeout=60.0,
+        cache=False,
+        cache_expires=None,
+        cache_store=True,
+        phase="read",
     ):
-        """Call api."""
+        """Call api, recording timing and outcome under phase.
+
+        GET responses with cache set are served from and stored in the
+        response cache until cache_expires, or for good if that is None.
+        A GET that returns the same content as the previous call of the url
+        returns the previous response object, so callers can skip parsing
+        with an identity check.
+        One off reads set cache_store false, so neither the response cache
+        nor the validators keep their responses.
+        """
         if base_url is None:
             base_url = API_URL
         url = f"{base_url}{endpoint}"
@@ -142,48 +651,186 @@ class WienerNetzeAPI:
             url += ("?" if "?" not in endpoint else "&") + parse.urlencode(query)
         _LOGGER.debug(url)
 
+        cache = cache and method == "GET"
+        if cache:
+            await self._cache.async_load()
+            if (response := self._cache.get(url)) is not None:
+                _LOGGER.debug("cache hit")
+                self.metrics.record(phase, None, "cache")
+                return response
+
+        if not self.breaker.allow():
+            # serve the last known data while the gateway is given a rest
+            self.metrics.record(phase, None, "circuit_open")
+            if (validator := self._validators.get(url)) is not None:
+                return validator["response"]
+            raise CircuitOpenError("WienerNetze circuit breaker is open")
+
+        with self.metrics.measure(phase):
+            response = await self._with_retries(
+                self._request, method, url, data, timeout, phase, cache_store
+            )
+
+        if cache and cache_store and response:
+            self._cache.set(url, response, cache_expires)
+        return response
+
+    async def _request(self, method, url, data, timeout, phase, store=True):
+        """Send one request to the gateway within the domain wide limit.
+
+        The token of this account's limiter is taken first, so a throttled
+        account does not hold a domain wide slot while it waits.
+        """
+        await self.limiter.acquire()
+        async with self._gate("api"):
+            return await self._send(method, url, data, timeout, phase, store)
+
+    async def _send(self, method, url, data, timeout, phase, store=True):
+        """Send one request to the gateway."""
         headers = {
-            "Authorization": f"Bearer {self._access_token}",
+            "Authorization": f"Bearer {self._tokens.access_token}",
             "X-Gateway-APIKey": self._api_gateway_token,
         }
+        validator = self._validators.get(url) if method == "GET" else None
+        if validator is not None:
+            if validator["etag"]:
+                headers[hdrs.IF_NONE_MATCH] = validator["etag"]
+            if validator["last_modified"]:
+                headers[hdrs.IF_MODIFIED_SINCE] = validator["last_modified"]
+
+        session = self._ensure_session()
+        async with session.request(method, url, headers=headers, json=data, timeout=timeout) as resp:
+            if resp.status == 304 and validator is not None:
+                _LOGGER.debug("not modified")
+                return validator["response"]
+            if resp.status in (401, 403):
+                self._invalidate_auth()
+            resp.raise_for_status()
+            body = await resp.read()
+            digest = hashlib.sha1(body).digest()
+            if validator is not None and validator["digest"] == digest:
+                _LOGGER.debug("unchanged")
+                response = validator["response"]
+            else:
+                response = await self._parse(phase, loads, body)
+            if method == "GET" and store:
+                self._validators[url] = {
+                    "etag": resp.headers.get(hdrs.ETAG),
+                    "last_modified": resp.headers.get(hdrs.LAST_MODIFIED),
+                    "digest": digest,
+                    "response": response,
+                }
+                self._validators.move_to_end(url)
+                while len(self._validators) > VALIDATOR_MAX_ENTRIES:
+                    self._validators.popitem(last=False)
 
-        async with self.session.request(method, url, headers=headers, json=data, timeout=timeout) as resp:
-            return await resp.json()
+        return response
+
+    def _cache_expiry(self, date_to: datetime) -> datetime | None:
+        """Keep windows of finalized days for good and open windows shortly."""
+        now = datetime.now(date_to.tzinfo)
+        finalized = (now - timedelta(days=CACHE_FINALIZED_DAYS)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if date_to <= finalized:
+            return None
+        return now + timedelta(minutes=CACHE_OPEN_TTL)
 
     def _dt_string(self, datetime_string):
+        if datetime_string.tzinfo is not None:
+            datetime_string = datetime_string.astimezone(timezone.utc)
         return datetime_string.strftime(API_DATE_FORMAT)[:-3] + "Z"
 
     async def get_meter_reader(self):
         """Get meter reader from the smartmeter api."""
         _LOGGER.debug("get_meter_reader")
-        return await self._call_api("zaehlpunkt/meterReadings")
+        return await self._call_api("zaehlpunkt/meterReadings", phase="meter_readings")
 
     async def get_meter_readers(self):
-        """Get a list of meter readers from the smartmeter api."""
+        """Get a list of meter readers from the smartmeter api, cached for a day."""
         _LOGGER.debug("get_meter_readers")
-        return await self._call_api("zaehlpunkte")
+        return await self._cached_metadata(
+            "zaehlpunkte", lambda: self._call_api("zaehlpunkte", phase="zaehlpunkte")
+        )
+
+    async def get_meter_customer_ids(self) -> dict[str, str]:
+        """Return the customer id (geschaeftspartner) of every meter of the account."""
+        return {
+            meter_reader["zaehlpunktnummer"]: partner["geschaeftspartner"]
+            for partner in await self.get_meter_readers()
+            for meter_reader in partner.get("zaehlpunkte", [])
+        }
+
+    async def get_consumption(
+        self,
+        meter_reader: str,
+        customer_id: str,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        resolution: str = "HOUR",
+        cache_store: bool = True,
+    ):
+        """Get verbrauchRaw data from the smartmeter api.
 
-    async def get_consumption(self, meter_reader: str, customer_id: str):
-        """Get verbrauchRaw data from the smartmeter api."""
+        One off reads of long ranges set cache_store false, so they neither
+        keep the responses in memory nor evict the windows of the imports.
+        """
         _LOGGER.debug("get_consumption")
         endpoint = f"messdaten/{customer_id}/{meter_reader}/verbrauch"
-        date_from = datetime.today() - timedelta(days=4)
-        date_to = datetime.now()
+        if date_from is None:
+            date_from = (datetime.today() - timedelta(days=4)).replace(
+                hour=23, minute=00, second=0, microsecond=0
+            )
+        if date_to is None:
+            date_to = datetime.now()
+        if date_to >= datetime.now(date_to.tzinfo) - timedelta(minutes=CACHE_OPEN_TTL):
+            # a window that ends now has a new url on every call, storing it
+            # would only evict windows that are requested again
+            cache_store = False
         query = {
-            "dateFrom": self._dt_string(
-                date_from.replace(hour=23, minute=00, second=0, microsecond=0)
-            ),
+            "dateFrom": self._dt_string(date_from),
             "dateTo": self._dt_string(date_to),
             "granularity": "DAY",
-            "dayViewResolution": "HOUR"
+            "dayViewResolution": resolution
+        }
+        return await self._call_api(
+            endpoint=endpoint,
+            query=query,
+            cache=True,
+            cache_expires=self._cache_expiry(date_to),
+            cache_store=cache_store,
+            phase="verbrauch",
+        )
+
+    async def get_meter_values(
+        self,
+        meter_reader: str,
+        customer_id: str,
+        value_type: str,
+        date_from: datetime,
+        date_to: datetime,
+    ):
+        """Get measured values of a meter without changing the default meter."""
+        _LOGGER.debug("get_meter_values")
+        endpoint = f"zaehlpunkte/{customer_id}/{meter_reader}/messwerte"
+        query = {
+            "datumVon": date_from.strftime(API_DAY_FORMAT),
+            "datumBis": date_to.strftime(API_DAY_FORMAT),
+            "wertetyp": value_type,
         }
-        return await self._call_api(endpoint=endpoint, query=query)
+        return await self._call_api(
+            endpoint=endpoint,
+            query=query,
+            cache=True,
+            cache_expires=self._cache_expiry(date_to),
+            phase="messwerte",
+        )
 
     async def get_consumptions(self):
         """Get consumptions data from the smartmeter api."""
         _LOGGER.debug("get_consumptions")
         endpoint = "zaehlpunkt/consumptions"
-        return await self._call_api(endpoint=endpoint)
+        return await self._call_api(endpoint=endpoint, phase="consumptions")
 
     async def set_default_meterreader(self, meter_reader: str, customer_id: str):
         """Set default meterreader."""
@@ -192,4 +839,6 @@ class WienerNetzeAPI:
         data = {
             "zaehlpunktNummer": meter_reader
         }
-        return await self._call_api(endpoint=endpoint, data=data, method="PUT")
\ No newline at end of file
+        return await self._call_api(
+            endpoint=endpoint, data=data, method="PUT", phase="put_default"
+        )
\ No newline at end of file
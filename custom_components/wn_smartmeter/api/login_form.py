@@ -0,0 +1,35 @@
+"""Extracts the action of the login form from the log.wien login page."""
+from __future__ import annotations
+from html.parser import HTMLParser
+
+
+class _FormFound(Exception):
+    """Stops parsing at the first form."""
+
+
+class _FormActionParser(HTMLParser):
+    """Parser that only looks at start tags until the first form."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.action: str | None = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "form":
+            return
+        for name, value in attrs:
+            if name == "action":
+                self.action = value
+                raise _FormFound
+        # a form without an action does not count, like //form/@action
+
+
+def extract_form_action(body: str) -> str | None:
+    """Return the action of the first form with one, or None."""
+    parser = _FormActionParser()
+    try:
+        parser.feed(body)
+        parser.close()
+    except _FormFound:
+        pass
+    return parser.action
@@ -0,0 +1,125 @@
+"""In-memory latency histograms and outcome counters of the API client."""
+from __future__ import annotations
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import aiohttp
+
+from ..const import METRICS_BUCKETS, PARSE_BUCKETS
+
+
+def outcome(err: BaseException) -> str:
+    """Return the outcome name of a failed call."""
+    if isinstance(err, aiohttp.ClientResponseError):
+        return f"http_{err.status}"
+    return type(err).__name__
+
+
+class Histogram:
+    """Latency histogram with fixed buckets."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = METRICS_BUCKETS) -> None:
+        """Initialize an empty histogram."""
+        self.bounds = bounds
+        # the last bucket counts everything above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add a duration."""
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        """Return the histogram."""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class Metrics:
+    """Timing and outcome of every phase of the client.
+
+    Phases are the login steps, the token refresh and one name per API
+    endpoint, so meters and dates do not multiply the number of histograms.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.histograms: dict[str, Histogram] = {}
+        self.outcomes: dict[str, Counter[str]] = {}
+        # requests sent and how many of them failed
+        self.requests = 0
+        self.failures = 0
+        # phase -> time spent parsing on the event loop and in the executor
+        self.parsing: dict[str, dict[str, Histogram]] = {}
+        self.parsed_bytes: Counter[str] = Counter()
+
+    def record(self, phase: str, seconds: float | None, result: str) -> None:
+        """Record one call of a phase, seconds is None for calls without I/O."""
+        self.outcomes.setdefault(phase, Counter())[result] += 1
+        if seconds is not None:
+            self.histograms.setdefault(phase, Histogram()).observe(seconds)
+
+    def record_parse(self, phase: str, seconds: float, size: int, offloaded: bool) -> None:
+        """Record the parsing of a body, inline parsing blocks the event loop."""
+        histograms = self.parsing.setdefault(phase, {})
+        where = "executor" if offloaded else "loop"
+        histograms.setdefault(where, Histogram(PARSE_BUCKETS)).observe(seconds)
+        self.parsed_bytes[phase] += size
+
+    @contextmanager
+    def measure(self, phase: str, request: bool = True) -> Iterator[None]:
+        """Time the block and record its outcome.
+
+        Blocks with request set count towards the requests and failures.
+        """
+        start = time.monotonic()
+        if request:
+            self.requests += 1
+        try:
+            yield
+        except Exception as err:
+            if request:
+                self.failures += 1
+            self.record(phase, time.monotonic() - start, outcome(err))
+            raise
+        self.record(phase, time.monotonic() - start, "ok")
+
+    def as_dict(self) -> dict:
+        """Return all metrics."""
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "phases": {
+                phase: {
+                    "outcomes": dict(self.outcomes[phase]),
+                    "latency": self.histograms[phase].as_dict()
+                    if phase in self.histograms
+                    else None,
+                }
+                for phase in sorted(self.outcomes)
+            },
+            "parsing": {
+                phase: {
+                    "bytes": self.parsed_bytes[phase],
+                    **{where: histogram.as_dict() for where, histogram in histograms.items()},
+                }
+                for phase, histograms in sorted(self.parsing.items())
+            },
+        }
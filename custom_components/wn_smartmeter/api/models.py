@@ -0,0 +1,146 @@
+"""Typed decoding of the WienerNetze API responses.
+
+Responses are checked while they are decoded, so a malformed payload fails
+with a clear error right away instead of a KeyError deep inside a sensor
+update. Measured values are turned into compact records in kWh with epoch
+timestamps.
+"""
+from __future__ import annotations
+import json
+from datetime import datetime
+from typing import Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class MalformedResponseError(ValueError):
+    """Raised when a response does not look like the endpoint's schema."""
+
+
+class Measurement(NamedTuple):
+    """A measured value in kWh between two epoch timestamps."""
+
+    start: int
+    end: int
+    value: float
+
+
+class Consumptions(NamedTuple):
+    """Consumption in kWh of the last two days of the default meter."""
+
+    yesterday: float | None
+    day_before_yesterday: float | None
+
+
+def loads(body: bytes) -> Any:
+    """Decode a JSON body, with orjson if it is installed."""
+    if not body.strip():
+        return None
+    try:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+    except ValueError as err:
+        raise MalformedResponseError(f"Response is not JSON: {err}") from err
+
+
+def _object(response: Any, endpoint: str) -> dict[str, Any]:
+    if not isinstance(response, dict):
+        raise MalformedResponseError(
+            f"{endpoint}: expected an object, got {type(response).__name__}"
+        )
+    return response
+
+
+def _list(value: Any, endpoint: str, field: str) -> list[Any]:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise MalformedResponseError(
+            f"{endpoint}: {field} is a {type(value).__name__}, expected a list"
+        )
+    return value
+
+
+def _number(value: Any, endpoint: str, field: str) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise MalformedResponseError(f"{endpoint}: {field} is not a number: {value!r}")
+    return value
+
+
+def _timestamp(value: Any, endpoint: str, field: str) -> int:
+    if not isinstance(value, str):
+        raise MalformedResponseError(f"{endpoint}: {field} is not a date: {value!r}")
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError as err:
+        raise MalformedResponseError(f"{endpoint}: {field} is not a date: {value!r}") from err
+
+
+def _measurements(
+    values: list[Any], endpoint: str, value_key: str, start_key: str, end_key: str
+) -> list[Measurement]:
+    measurements = []
+    for value in values:
+        value = _object(value, endpoint)
+        number = _number(value.get(value_key), endpoint, value_key)
+        if number is None:
+            continue
+        measurements.append(
+            Measurement(
+                _timestamp(value.get(start_key), endpoint, start_key),
+                _timestamp(value.get(end_key), endpoint, end_key),
+                number / 1000,
+            )
+        )
+    return measurements
+
+
+def decode_verbrauch(response: Any) -> list[Measurement]:
+    """Decode a messdaten verbrauch response, skipping missing values."""
+    response = _object(response, "verbrauch")
+    values = _list(response.get("values"), "verbrauch", "values")
+    return _measurements(values, "verbrauch", "wert", "zeitpunktVon", "zeitpunktBis")
+
+
+def decode_messwerte(response: Any) -> list[Measurement]:
+    """Decode the values of the first register of a messwerte response."""
+    response = _object(response, "messwerte")
+    zaehlwerke = _list(response.get("zaehlwerke"), "messwerte", "zaehlwerke")
+    if not zaehlwerke:
+        return []
+    zaehlwerk = _object(zaehlwerke[0], "messwerte")
+    values = _list(zaehlwerk.get("messwerte"), "messwerte", "messwerte")
+    return _measurements(values, "messwerte", "messwert", "zeitVon", "zeitBis")
+
+
+def decode_meter_readings(response: Any) -> float | None:
+    """Decode the latest reading in kWh of a meterReadings response."""
+    response = _object(response, "meterReadings")
+    readings = _list(response.get("meterReadings"), "meterReadings", "meterReadings")
+    if not readings:
+        return None
+    value = _number(
+        _object(readings[0], "meterReadings").get("value"), "meterReadings", "value"
+    )
+    return value / 1000 if value is not None else None
+
+
+def decode_consumptions(response: Any) -> Consumptions:
+    """Decode a consumptions response."""
+    response = _object(response, "consumptions")
+
+    def consumption(field: str) -> float | None:
+        if (day := response.get(field)) is None:
+            return None
+        value = _number(_object(day, "consumptions").get("value"), "consumptions", field)
+        return value / 1000 if value is not None else None
+
+    return Consumptions(
+        consumption("consumptionYesterday"), consumption("consumptionDayBeforeYesterday")
+    )
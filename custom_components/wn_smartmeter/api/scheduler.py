@@ -0,0 +1,140 @@
+"""Domain wide scheduling of the refreshes of all accounts."""
+from __future__ import annotations
+import asyncio
+import hashlib
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, callback
+
+from .metrics import Histogram
+from ..const import (
+    DATA_SCHEDULER,
+    SCHEDULER_MAX_LOGINS,
+    SCHEDULER_MAX_API_CALLS,
+    SCHEDULER_SLOT,
+)
+
+PRIORITY_USER = 0
+PRIORITY_REFRESH = 1
+PRIORITY_BACKFILL = 2
+
+# priority of the API calls made by the current task and the tasks it starts
+PRIORITY: ContextVar[int] = ContextVar(f"{__name__}.priority", default=PRIORITY_REFRESH)
+
+
+class PrioritySemaphore:
+    """Semaphore that hands free slots to the waiter with the lowest priority value.
+
+    Waiters of the same priority are served in arrival order.
+    """
+
+    def __init__(self, limit: int) -> None:
+        """Initialize the semaphore."""
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.wait_time = Histogram()
+
+    @property
+    def queued(self) -> int:
+        """Return the number of waiting callers."""
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a slot."""
+        start = time.monotonic()
+        if self.in_flight < self.limit and not self.queued:
+            self.in_flight += 1
+            self.wait_time.observe(0.0)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over already, pass it on
+                self.release()
+            raise
+        self.wait_time.observe(time.monotonic() - start)
+
+    def release(self) -> None:
+        """Free a slot or hand it to the next waiter."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # the slot stays in flight, it now belongs to the waiter
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def as_dict(self) -> dict:
+        """Return the state of the semaphore."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "wait_time": self.wait_time.as_dict(),
+        }
+
+
+def phase_offset(key: str, period: timedelta) -> timedelta:
+    """Return a stable offset in [0, period) for a key."""
+    digest = hashlib.sha1(key.encode()).digest()
+    return timedelta(seconds=int.from_bytes(digest[:4], "big") % int(period.total_seconds()))
+
+
+class FleetScheduler:
+    """Caps the logins and API calls of all accounts and staggers their refreshes.
+
+    Every account refreshes on its own phase of a grid of slots, so accounts
+    do not line up after a restart. Logins and API calls wait for a slot of
+    a domain wide limit, user requests first and backfills last.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the scheduler."""
+        self.slot = timedelta(minutes=SCHEDULER_SLOT)
+        self.gates = {
+            "login": PrioritySemaphore(SCHEDULER_MAX_LOGINS),
+            "api": PrioritySemaphore(SCHEDULER_MAX_API_CALLS),
+        }
+
+    @asynccontextmanager
+    async def acquire(self, gate: str) -> AsyncIterator[None]:
+        """Hold a slot of a gate with the priority of the current task."""
+        semaphore = self.gates[gate]
+        await semaphore.acquire(PRIORITY.get())
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def phase(self, key: str) -> timedelta:
+        """Return the phase of an account within a slot."""
+        return phase_offset(key, self.slot)
+
+    def align(self, key: str, now: datetime, interval: timedelta) -> timedelta:
+        """Stretch an interval so it ends on the phase of the account."""
+        slot = self.slot.total_seconds()
+        due = (now + interval).timestamp() - self.phase(key).total_seconds()
+        return interval + timedelta(seconds=-due % slot)
+
+    def as_dict(self) -> dict:
+        """Return the queue depth and wait times of the gates."""
+        return {gate: semaphore.as_dict() for gate, semaphore in self.gates.items()}
+
+
+@callback
+def get_scheduler(hass: HomeAssistant) -> FleetScheduler:
+    """Return the scheduler of the domain."""
+    if DATA_SCHEDULER not in hass.data:
+        hass.data[DATA_SCHEDULER] = FleetScheduler()
+    return hass.data[DATA_SCHEDULER]
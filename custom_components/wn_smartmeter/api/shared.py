@@ -0,0 +1,42 @@
+"""API clients shared by everything that uses the same account."""
+from __future__ import annotations
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .client import WienerNetzeAPI
+from .scheduler import get_scheduler
+from ..const import DOMAIN, DATA_APIS
+
+
+@callback
+def get_api(hass: HomeAssistant, username: str, password: str) -> WienerNetzeAPI:
+    """Return the client of an account, creating it on first use.
+
+    The config flow and the coordinator of a username share one session,
+    one set of tokens and the account metadata. Another password replaces
+    the client, a coordinator still using the old one keeps it until it is
+    unloaded.
+    """
+    if DATA_APIS not in hass.data:
+        hass.data[DATA_APIS] = {}
+
+        async def _async_close_all(event: Event) -> None:
+            for api in hass.data[DATA_APIS].values():
+                await api.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_all)
+
+    apis: dict[str, WienerNetzeAPI] = hass.data[DATA_APIS]
+    api = apis.get(username)
+    if api is not None and api.password == password:
+        return api
+    if api is not None and not any(
+        coordinator.wienernetze_api is api
+        for coordinator in hass.data.get(DOMAIN, {}).values()
+    ):
+        hass.async_create_task(api.async_close())
+    apis[username] = WienerNetzeAPI(
+        hass, username, password, scheduler=get_scheduler(hass)
+    )
+    return apis[username]
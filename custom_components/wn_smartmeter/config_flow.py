@@ -3,20 +3,24 @@ from __future__ import annotations
 
 from typing import Any
 import logging
+import os
 import voluptuous as vol
 
-from homeassistant.core import callback
+from homeassistant.core import callback, valid_entity_id
 from homeassistant.config_entries import (
     ConfigEntry,
     ConfigFlow,
 )
 from homeassistant.helpers.schema_config_entry_flow import (
+    SchemaCommonFlowHandler,
+    SchemaFlowError,
     SchemaFlowFormStep,
     SchemaOptionsFlowHandler,
 )
 from homeassistant.data_entry_flow import FlowResult
 
-from .api import WienerNetzeAPI
+from .api import WienerNetzeAPI, get_api
+from .tariff import parse_schedule
 
 from .const import (
     DOMAIN,
@@ -26,16 +30,57 @@ from .const import (
     CONF_CUSTOMER_ID,
     CONF_SCAN_INTERVAL,
     DEFAULT_SCAN_INTERVAL,
+    CONF_TARIFF_TYPE,
+    CONF_TARIFF_PRICE,
+    CONF_TARIFF_SCHEDULE,
+    CONF_TARIFF_FILE,
+    CONF_TARIFF_ENTITY,
+    TARIFF_NONE,
+    TARIFF_TIME_OF_USE,
+    TARIFF_FILE,
+    TARIFF_ENTITY,
+    TARIFF_TYPES,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
+async def _validate_options(
+    handler: SchemaCommonFlowHandler, user_input: dict[str, Any]
+) -> dict[str, Any]:
+    """Reject tariff options that would fail when the entry is set up."""
+    hass = handler.parent_handler.hass
+    tariff_type = user_input.get(CONF_TARIFF_TYPE)
+    if tariff_type == TARIFF_TIME_OF_USE:
+        try:
+            parse_schedule(user_input.get(CONF_TARIFF_SCHEDULE, ""))
+        except ValueError as err:
+            _LOGGER.debug("Invalid schedule: %s", err)
+            raise SchemaFlowError("tariff_schedule") from err
+    elif tariff_type == TARIFF_FILE:
+        # relative paths are relative to the configuration directory
+        path = user_input[CONF_TARIFF_FILE] = hass.config.path(
+            user_input.get(CONF_TARIFF_FILE, "")
+        )
+        if (
+            not path
+            or not hass.config.is_allowed_path(path)
+            or not await hass.async_add_executor_job(os.path.isfile, path)
+        ):
+            raise SchemaFlowError("tariff_file")
+    elif tariff_type == TARIFF_ENTITY:
+        entity_id = user_input.get(CONF_TARIFF_ENTITY, "")
+        if not valid_entity_id(entity_id) or hass.states.get(entity_id) is None:
+            raise SchemaFlowError("tariff_entity")
+    return user_input
+
+
 class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
     """Config flow for WienerNetze."""
 
     VERSION = 1
     _previous_input: dict[str, Any]
+    _meter_readers: dict[str, str]
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -45,7 +90,7 @@ class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            api = WienerNetzeAPI(
+            api = get_api(
                 self.hass, user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
             )
             valid = await self._test_credentials(api)
@@ -53,7 +98,9 @@ class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
             _LOGGER.debug("logged in: %s", valid)
             if valid:
                 self._previous_input = user_input
-                return await self.async_step_select_meter_reader(user_input=user_input)
+                # meter reader -> customer id of all business partners
+                self._meter_readers = await self._get_meter_readers(api)
+                return await self.async_step_select_meter_reader()
 
             errors["base"] = "auth"
 
@@ -81,42 +128,28 @@ class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
         _LOGGER.debug("Step select meter reader")
         errors = {}
 
-        if CONF_METER_READER in user_input:
+        if user_input is not None:
+            meter_reader = user_input[CONF_METER_READER]
+            await self.async_set_unique_id(meter_reader)
+            self._abort_if_unique_id_configured()
             user_input.update(self._previous_input)
-            return self.async_create_entry(
-                title=user_input[CONF_METER_READER], data=user_input
-            )
-        else:
-            api = WienerNetzeAPI(
-                self.hass, user_input[CONF_USERNAME], user_input[CONF_PASSWORD]
-            )
-            response = await self._get_meter_readers(api)
-            _LOGGER.debug(response)
-            meter_readers = response[0]
-            customerId = response[0]["geschaeftspartner"]
-            _LOGGER.debug(customerId)
-            if "zaehlpunkte" not in meter_readers:
-                _LOGGER.error("no meter readers found.")
+            user_input[CONF_CUSTOMER_ID] = self._meter_readers[meter_reader]
+            return self.async_create_entry(title=meter_reader, data=user_input)
+
+        if not self._meter_readers:
+            _LOGGER.error("no meter readers found.")
+            return self.async_abort(reason="no_meter_readers")
 
         return self.async_show_form(
             step_id="select_meter_reader",
             data_schema=vol.Schema(
                 {
-                    vol.Required(
-                        CONF_METER_READER,
-                        default="",
-                    ): vol.In(
-                        {
-                            meter_reader["zaehlpunktnummer"]
-                            for meter_reader in meter_readers["zaehlpunkte"]
-                        }
+                    vol.Required(CONF_METER_READER): vol.In(
+                        sorted(self._meter_readers)
                     ),
                     vol.Required(
                         CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL
                     ): int,
-                    vol.Required(
-                        CONF_CUSTOMER_ID, default=customerId
-                    ): str,
                 }
             ),
             errors=errors,
@@ -124,15 +157,15 @@ class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
         )
 
     async def _test_credentials(self, api: WienerNetzeAPI):
-        """Return true if credentials is valid."""
+        """Return true if credentials is valid, reusing tokens of the account."""
         _LOGGER.debug("Testing credentials")
 
-        return await api.login()
+        return await api.ensure_login()
 
-    async def _get_meter_readers(self, api: WienerNetzeAPI):
-        """Return a list of meter readers."""
+    async def _get_meter_readers(self, api: WienerNetzeAPI) -> dict[str, str]:
+        """Return the customer id of every meter reader."""
         _LOGGER.debug("Get meter readers")
-        return await api.get_meter_readers()
+        return await api.get_meter_customer_ids()
 
     @staticmethod
     @callback
@@ -145,10 +178,32 @@ class WienerNetzeFlowHandler(ConfigFlow, domain=DOMAIN):
                     default=config_entry.data.get(CONF_METER_READER, ""),
                 ): str,
                 vol.Required(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+                vol.Required(
+                    CONF_TARIFF_TYPE,
+                    default=config_entry.options.get(CONF_TARIFF_TYPE, TARIFF_NONE),
+                ): vol.In(TARIFF_TYPES),
+                vol.Optional(
+                    CONF_TARIFF_PRICE,
+                    default=config_entry.options.get(CONF_TARIFF_PRICE, 0.0),
+                ): vol.Coerce(float),
+                vol.Optional(
+                    CONF_TARIFF_SCHEDULE,
+                    default=config_entry.options.get(CONF_TARIFF_SCHEDULE, ""),
+                ): str,
+                vol.Optional(
+                    CONF_TARIFF_FILE,
+                    default=config_entry.options.get(CONF_TARIFF_FILE, ""),
+                ): str,
+                vol.Optional(
+                    CONF_TARIFF_ENTITY,
+                    default=config_entry.options.get(CONF_TARIFF_ENTITY, ""),
+                ): str,
             }
         )
 
         options_flow = {
-            "init": SchemaFlowFormStep(options_schema),
+            "init": SchemaFlowFormStep(
+                options_schema, validate_user_input=_validate_options
+            ),
         }
         return SchemaOptionsFlowHandler(config_entry, options_flow)
@@ -11,6 +11,9 @@ API_URL = "https://api.wstw.at/gateway/WN_SMART_METER_PORTAL_API_B2C/1.0/"
 API_CONFIG_URL = "https://smartmeter-web.wienernetze.at/assets/app-config.json"
 REDIRECT_URI = "https://smartmeter-web.wienernetze.at/"
 API_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+API_DAY_FORMAT = "%Y-%m-%d"
+VALUE_TYPE_METER_READ: Final = "METER_READ"
+VALUE_TYPE_DAY: Final = "DAY"
 AUTH_URL = "https://log.wien/auth/realms/logwien/protocol/openid-connect/"
 
 
@@ -24,6 +27,36 @@ LOGIN_ARGS = {
 }
 
 API_TIMEOUT = 30
+API_CONNECTION_LIMIT = 10
+API_KEEPALIVE_TIMEOUT = 60
+AUTH_COOKIE_DOMAIN = "log.wien"
+# requests per second and burst size per account
+API_RATE_LIMIT = 2.0
+API_RATE_BURST = 10
+RETRY_ATTEMPTS = 3
+# seconds
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 300
+# seconds before expiry at which a token is treated as expired
+TOKEN_REFRESH_MARGIN = 30
+# persisted tokens and account metadata
+TOKEN_STORAGE_VERSION = 1
+TOKEN_KEY_ITERATIONS = 100_000
+# seconds after which the api key and meter list are revalidated in the background
+METADATA_TTL = 86400
+# domain wide limits of concurrent logins and API calls
+SCHEDULER_MAX_LOGINS = 2
+SCHEDULER_MAX_API_CALLS = 6
+# minutes of the grid the refreshes of the accounts are spread over
+SCHEDULER_SLOT = 15
+# upper bounds in seconds of the latency histogram buckets
+METRICS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# response bodies from this size in bytes are parsed in the executor
+PARSE_EXECUTOR_THRESHOLD = 65536
+# upper bounds in seconds of the parse time histogram buckets
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
 
 
 def build_access_token_args(**kwargs):
@@ -37,8 +70,21 @@ def build_access_token_args(**kwargs):
     return args
 
 
+def build_refresh_token_args(**kwargs):
+    """Build refresh token args and add kwargs."""
+    args = {
+        "grant_type": "refresh_token",
+        "client_id": "wn-smartmeter",
+    }
+    args.update(**kwargs)
+    return args
+
+
 # config
 DOMAIN = "wn_smartmeter"
+# hass.data key of the API clients shared by username
+DATA_APIS: Final = f"{DOMAIN}_apis"
+DATA_SCHEDULER: Final = f"{DOMAIN}_scheduler"
 NAME = "WN Smartmeter"
 TIMEZONE = "Europe/Vienna"
 DEFAULT_SCAN_INTERVAL: Final = 60
@@ -47,7 +93,97 @@ CONF_PASSWORD: Final = "password"
 CONF_METER_READER: Final = "meter_reader"
 CONF_CUSTOMER_ID: Final = "customer_id"
 CONF_SCAN_INTERVAL: Final = "scan_interval"
+CONF_TARIFF_TYPE: Final = "tariff_type"
+CONF_TARIFF_PRICE: Final = "tariff_price"
+CONF_TARIFF_SCHEDULE: Final = "tariff_schedule"
+CONF_TARIFF_FILE: Final = "tariff_file"
+CONF_TARIFF_ENTITY: Final = "tariff_entity"
+
+TARIFF_NONE: Final = "none"
+TARIFF_FLAT: Final = "flat"
+TARIFF_TIME_OF_USE: Final = "time_of_use"
+TARIFF_FILE: Final = "file"
+TARIFF_ENTITY: Final = "entity"
+TARIFF_TYPES: Final = [TARIFF_NONE, TARIFF_FLAT, TARIFF_TIME_OF_USE, TARIFF_FILE, TARIFF_ENTITY]
+COST_STORAGE_VERSION: Final = 1
+# days of daily costs that are kept for the cost sensors
+COST_DAYS: Final = 62
+
+# response cache
+CACHE_STORAGE_VERSION: Final = 1
+CACHE_MAX_ENTRIES: Final = 256
+CACHE_SAVE_DELAY: Final = 30
+# minutes a response of a window that is not finalized yet stays cached
+CACHE_OPEN_TTL: Final = 15
+# days after which the measurements of a day are final
+CACHE_FINALIZED_DAYS: Final = 2
+
+# adaptive polling, intervals in minutes
+POLLING_STORAGE_VERSION: Final = 1
+POLLING_DENSE_INTERVAL: Final = 15
+POLLING_MAX_INTERVAL: Final = 360
+POLLING_WINDOW: Final = 60
+# number of publication times that are remembered per meter
+POLLING_HISTORY: Final = 14
+
+# responses remembered for conditional requests
+VALIDATOR_MAX_ENTRIES: Final = 64
+
+# statistics
+STATISTICS_STORAGE_VERSION: Final = 1
+STATISTICS_BACKFILL_DAYS: Final = 30
+STATISTICS_WINDOW_DAYS: Final = 7
+# windows fetched at the same time by a backfill
+BACKFILL_CONCURRENCY: Final = 3
+SERVICE_BACKFILL: Final = "backfill"
+
+# recent days in which holes are fetched again, older windows are cached for good
+COVERAGE_REFETCH_DAYS: Final = CACHE_FINALIZED_DAYS
+# holes closer than this many seconds are fetched with one request
+COVERAGE_MAX_GAP: Final = 6 * 3600
+
+# export
+SERVICE_EXPORT: Final = "export"
+EXPORT_FORMAT_CSV: Final = "csv"
+EXPORT_FORMAT_PARQUET: Final = "parquet"
+EXPORT_RESOLUTIONS: Final = ("QUARTER-HOUR", "HOUR")
+# rows per write, and per row group of parquet files
+EXPORT_BATCH_ROWS: Final = 4096
+
+# in-memory series
+SERIES_WARMUP_DAYS: Final = 35
+SERIES_RETENTION_DAYS: Final = 400
+
+# derived sensors
+AGGREGATE_AVERAGE_DAYS: Final = 30
+AGGREGATE_NIGHT_DAYS: Final = 7
+# local hours [start, end) that count as night
+AGGREGATE_NIGHT_HOURS: Final = (0, 5)
+
+# hour of week statistics
+PROFILE_STORAGE_VERSION: Final = 1
+# weight of the latest week in the expected consumption of an hour
+PROFILE_EWMA_ALPHA: Final = 0.2
+# quantile of an hour's consumption that counts as its base load
+PROFILE_QUANTILE: Final = 0.1
+# weeks an hour needs before it is scored
+PROFILE_MIN_SAMPLES: Final = 4
 
 ATTR_METER_READER: Final = "MeterReader"
 ATTR_CONSUMPTION_YESTERDAY: Final = "ConsumptionYesterday"
 ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY: Final = "ConsumptionDayBeforeYesterday"
+ATTR_CONSUMPTION_WEEK_TO_DATE: Final = "ConsumptionWeekToDate"
+ATTR_CONSUMPTION_MONTH_TO_DATE: Final = "ConsumptionMonthToDate"
+ATTR_CONSUMPTION_DAILY_AVERAGE: Final = "ConsumptionDailyAverage"
+ATTR_PEAK_HOUR_CONSUMPTION: Final = "PeakHourConsumption"
+ATTR_NIGHT_BASE_LOAD: Final = "NightBaseLoad"
+ATTR_COST_YESTERDAY: Final = "CostYesterday"
+ATTR_COST_MONTH_TO_DATE: Final = "CostMonthToDate"
+ATTR_LAST_REFRESH_DURATION: Final = "LastRefreshDuration"
+ATTR_REQUESTS_PER_REFRESH: Final = "RequestsPerRefresh"
+ATTR_REQUEST_FAILURES: Final = "RequestFailures"
+ATTR_ANOMALY_SCORE: Final = "AnomalyScore"
+ATTR_BASE_LOAD: Final = "BaseLoad"
+
+# dispatcher signal sent after every refresh of an account, formatted with the username
+SIGNAL_REFRESHED: Final = f"{DOMAIN}_refreshed_{{}}"
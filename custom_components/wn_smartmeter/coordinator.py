@@ -1,97 +1,571 @@
 """Data update coordinator for WienerNetze."""
 
+import asyncio
 import logging
-from typing import Any
+import time
+from collections.abc import Awaitable
+from typing import Any, TypeVar
 from datetime import timedelta, datetime
-from dateutil.parser import parse
-import pytz
+import aiohttp
 
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.helpers.entity import Entity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
     TIMEZONE,
-    CONF_USERNAME,
-    CONF_PASSWORD,
     CONF_METER_READER,
     CONF_CUSTOMER_ID,
     CONF_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
     ATTR_METER_READER,
     ATTR_CONSUMPTION_YESTERDAY,
     ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY,
+    VALUE_TYPE_METER_READ,
+    VALUE_TYPE_DAY,
+    POLLING_STORAGE_VERSION,
+    POLLING_DENSE_INTERVAL,
+    POLLING_MAX_INTERVAL,
+    POLLING_WINDOW,
+    POLLING_HISTORY,
+    SIGNAL_REFRESHED,
 )
 
-from .api import WienerNetzeAPI
+from .api import CircuitOpenError, get_api
+from .api.scheduler import PRIORITY, PRIORITY_BACKFILL, PRIORITY_USER, get_scheduler
+from .api.models import (
+    decode_consumptions,
+    decode_messwerte,
+    decode_meter_readings,
+)
+from .aggregates import AggregateEngine
+from .export import async_export
+from .hourly import HourlyEngine
+from .load_profile import LoadProfileEngine
+from .series import IntervalSeries
+from .statistics import WienerNetzeStatisticsImporter
+from .tariff import CostEngine, tariff_from_options
 
 _LOGGER = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+# values published by upstream, the derived ones also change with the clock
+UPSTREAM_ATTRS = (
+    ATTR_METER_READER,
+    ATTR_CONSUMPTION_YESTERDAY,
+    ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY,
+)
+
+
+class AdaptivePollingSchedule:
+    """Learns when the data of a meter changes and derives the next interval.
+
+    Polls are dense around the learned publication time, back off
+    exponentially while nothing changes and return to the base interval once
+    new data arrived.
+    """
+
+    def __init__(self, publications: list[int] | None = None) -> None:
+        """Initialize the schedule with learned minutes of the day."""
+        self.publications: list[int] = list(publications or [])
+        self.unchanged = 0
+
+    @property
+    def expected_publication(self) -> int | None:
+        """Return the median minute of the day new data was seen at."""
+        if not self.publications:
+            return None
+        return sorted(self.publications)[len(self.publications) // 2]
+
+    def record(self, now: datetime, changed: bool) -> None:
+        """Record the outcome of a refresh."""
+        if not changed:
+            self.unchanged += 1
+            return
+        self.unchanged = 0
+        self.publications.append(now.hour * 60 + now.minute)
+        del self.publications[:-POLLING_HISTORY]
+
+    def next_interval(self, now: datetime, base: timedelta) -> timedelta:
+        """Return the interval until the next poll."""
+        # the cap never polls more often than the configured interval
+        interval = min(
+            base * 2 ** min(self.unchanged, 10),
+            max(base, timedelta(minutes=POLLING_MAX_INTERVAL)),
+        )
+        if (expected := self.expected_publication) is None:
+            return interval
+        minute = now.hour * 60 + now.minute
+        window_start = expected - POLLING_WINDOW
+        dense = timedelta(minutes=POLLING_DENSE_INTERVAL)
+        # modulo a day, a window around midnight spans both days
+        if (minute - window_start) % (24 * 60) <= 2 * POLLING_WINDOW:
+            return min(interval, dense)
+        # do not sleep past the start of the publication window
+        until_window = timedelta(minutes=(window_start - minute) % (24 * 60))
+        return max(min(interval, until_window), dense)
+
 
-class WienerNetzeUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
-    """WienerNetze data update coordinator."""
+class WienerNetzeUpdateCoordinator(DataUpdateCoordinator[dict[str, dict[str, Any]]]):
+    """WienerNetze data update coordinator for all meters of one account.
+
+    The data is keyed by meter reader, so every config entry of the same
+    username shares one login and one scheduled refresh.
+    """
 
     def __init__(
         self,
         hass: HomeAssistant,
-        config_entry: ConfigEntry,
+        username: str,
+        password: str,
     ) -> None:
         """Initialize WienerNetze data update coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name=DOMAIN,
-            update_interval=timedelta(minutes=config_entry.data[CONF_SCAN_INTERVAL]),
+            name=f"{DOMAIN} {username}",
+            update_interval=timedelta(minutes=DEFAULT_SCAN_INTERVAL),
+            # listeners are only called when the data of a meter changed
+            always_update=False,
         )
         _LOGGER.debug("setup")
-        _LOGGER.debug("meter_reader: %s", self.config_entry.data[CONF_METER_READER])
-        _LOGGER.debug("customer_id: %s", self.config_entry.data[CONF_CUSTOMER_ID])
-        _LOGGER.debug("scan_interval: %s", self.config_entry.data[CONF_SCAN_INTERVAL])
-        self.wienernetze_api = WienerNetzeAPI(
-            hass,
-            self.config_entry.data[CONF_USERNAME],
-            self.config_entry.data[CONF_PASSWORD],
-            self.config_entry.data[CONF_METER_READER],
+        self.username = username
+        # shared with the config flow and kept across entries of the account
+        self.wienernetze_api = get_api(hass, username, password)
+        self.scheduler = get_scheduler(hass)
+        # meter reader -> customer id
+        self.meters: dict[str, str] = {}
+        # config entry id -> meter reader it was added with
+        self._entry_meters: dict[str, str] = {}
+        # config entry id -> scan interval in minutes
+        self._scan_intervals: dict[str, int] = {}
+        self._setup_lock = asyncio.Lock()
+        # meters without the meter addressed endpoints need the default meter
+        self._default_meter_readers: set[str] = set()
+        self._default_meter_lock = asyncio.Lock()
+        self._importers: dict[str, WienerNetzeStatisticsImporter] = {}
+        # meter reader -> hourly consumption intervals
+        self.series: dict[str, IntervalSeries] = {}
+        self._aggregates: dict[str, AggregateEngine] = {}
+        self._costs: dict[str, CostEngine] = {}
+        self._profiles: dict[str, LoadProfileEngine] = {}
+        # (meter reader, kind) -> the last parsed response
+        self._parsed_responses: dict[tuple[str, str], Any] = {}
+        self._base_interval = timedelta(minutes=DEFAULT_SCAN_INTERVAL)
+        self._schedules: dict[str, AdaptivePollingSchedule] | None = None
+        # meter reader -> the upstream values and series version of the last refresh
+        self._upstream: dict[str, tuple] = {}
+        self._polling_store: Store[dict[str, list[int]]] = Store(
+            hass, POLLING_STORAGE_VERSION, f"{DOMAIN}.{slugify(username)}_polling"
         )
 
         self.entities: list[Entity] = []
+        # duration, requests and failed requests of the last refresh
+        self.last_refresh: dict[str, float] = {}
+
+    def add_meter(self, config_entry: ConfigEntry) -> None:
+        """Add the meter of a config entry to the batch."""
+        _LOGGER.debug("meter_reader: %s", config_entry.data[CONF_METER_READER])
+        _LOGGER.debug("customer_id: %s", config_entry.data[CONF_CUSTOMER_ID])
+        _LOGGER.debug("scan_interval: %s", config_entry.data[CONF_SCAN_INTERVAL])
+        # before the meter is registered, so an invalid tariff leaves nothing behind
+        tariff = tariff_from_options(config_entry.options)
+        self._entry_meters[config_entry.entry_id] = config_entry.data[CONF_METER_READER]
+        self.meters[config_entry.data[CONF_METER_READER]] = config_entry.data[
+            CONF_CUSTOMER_ID
+        ]
+        self._scan_intervals[config_entry.entry_id] = config_entry.data[
+            CONF_SCAN_INTERVAL
+        ]
+        series = self.series.setdefault(
+            config_entry.data[CONF_METER_READER], IntervalSeries()
+        )
+        self._aggregates[config_entry.data[CONF_METER_READER]] = AggregateEngine(
+            series
+        )
+        if tariff is not None:
+            self._costs[config_entry.data[CONF_METER_READER]] = CostEngine(
+                self.hass, config_entry.data[CONF_METER_READER], series, tariff
+            )
+        self._profiles[config_entry.data[CONF_METER_READER]] = LoadProfileEngine(
+            self.hass, config_entry.data[CONF_METER_READER], series
+        )
+        self._importers[config_entry.data[CONF_METER_READER]] = (
+            WienerNetzeStatisticsImporter(
+                self.hass,
+                self.wienernetze_api,
+                config_entry.data[CONF_METER_READER],
+                config_entry.data[CONF_CUSTOMER_ID],
+                series,
+            )
+        )
+        self._update_scan_interval()
+
+    def remove_meter(self, config_entry: ConfigEntry) -> None:
+        """Remove the meter of a config entry from the batch.
+
+        The meter is the one the entry was added with, the options may have
+        changed the meter reader of the entry since.
+        """
+        meter_reader = self._entry_meters.pop(config_entry.entry_id, None)
+        self._scan_intervals.pop(config_entry.entry_id, None)
+        self.meters.pop(meter_reader, None)
+        self._importers.pop(meter_reader, None)
+        self.series.pop(meter_reader, None)
+        self._aggregates.pop(meter_reader, None)
+        self._costs.pop(meter_reader, None)
+        self._profiles.pop(meter_reader, None)
+        self._upstream.pop(meter_reader, None)
+        for key in [key for key in self._parsed_responses if key[0] == meter_reader]:
+            del self._parsed_responses[key]
+        if self.data is not None:
+            self.data.pop(meter_reader, None)
+        self._update_scan_interval()
+
+    def _update_scan_interval(self) -> None:
+        """Refresh the batch as often as the most demanding entry asks for."""
+        minutes = min(self._scan_intervals.values(), default=DEFAULT_SCAN_INTERVAL)
+        self._base_interval = timedelta(minutes=minutes)
+        self.update_interval = self._base_interval
+
+    async def _async_update_schedule(self, data: dict[str, dict[str, Any]]) -> None:
+        """Adapt the update interval to the changes of this refresh."""
+        if self._schedules is None:
+            stored = await self._polling_store.async_load() or {}
+            self._schedules = {
+                meter_reader: AdaptivePollingSchedule(publications)
+                for meter_reader, publications in stored.items()
+            }
+        now = datetime.now(dt_util.get_time_zone(TIMEZONE))
+        for meter_reader, meter_data in data.items():
+            schedule = self._schedules.setdefault(
+                meter_reader, AdaptivePollingSchedule()
+            )
+            upstream = (
+                *(meter_data.get(attr) for attr in UPSTREAM_ATTRS),
+                self.series[meter_reader].version,
+            )
+            # the first values of a meter say nothing about publication times
+            if (previous := self._upstream.get(meter_reader)) is not None:
+                schedule.record(now, upstream != previous)
+            self._upstream[meter_reader] = upstream
+        self._polling_store.async_delay_save(
+            lambda: {
+                meter_reader: schedule.publications
+                for meter_reader, schedule in self._schedules.items()
+            },
+            POLLING_DENSE_INTERVAL * 60,
+        )
+        interval = min(
+            (
+                self._schedules[meter_reader].next_interval(now, self._base_interval)
+                for meter_reader in data
+            ),
+            default=self._base_interval,
+        )
+        # land on the phase of this account so accounts do not refresh together
+        self.update_interval = self.scheduler.align(self.username, now, interval)
+        _LOGGER.debug("next update in %s", self.update_interval)
+
+    async def async_request_refresh(self) -> None:
+        """Refresh on request, ahead of scheduled refreshes and backfills.
+
+        Scheduled and startup refreshes keep the default refresh priority.
+        """
+        token = PRIORITY.set(PRIORITY_USER)
+        try:
+            await super().async_request_refresh()
+        finally:
+            PRIORITY.reset(token)
 
-    async def _set_default_meterreader(self):
+    async def async_first_refresh_meter(self, meter_reader: str) -> bool:
+        """Fetch a newly added meter unless a concurrent setup already did.
+
+        Startup bursts of many accounts are bounded by the login and API
+        gates of the scheduler, later refreshes land on the account's phase.
+        """
+        async with self._setup_lock:
+            if self.data is None or meter_reader not in self.data:
+                await self.async_refresh()
+        return (
+            self.last_update_success
+            and self.data is not None
+            and meter_reader in self.data
+        )
+
+    async def _set_default_meterreader(self, meter_reader: str, customer_id: str):
         _LOGGER.debug("_set_default_meterreader()")
-        await self.wienernetze_api.set_default_meterreader(self.config_entry.data[CONF_METER_READER], self.config_entry.data[CONF_CUSTOMER_ID])
+        await self.wienernetze_api.set_default_meterreader(meter_reader, customer_id)
 
     async def _login(self):
-        await self.wienernetze_api.login()
+        try:
+            await self.wienernetze_api.ensure_login()
+        except CircuitOpenError:
+            # the client serves the last known responses while the circuit is open
+            _LOGGER.debug("circuit open, using last known data")
 
     async def _update_meterreader(self, data):
         _LOGGER.debug("_update_meterreader()")
-        await self._set_default_meterreader()
         response = await self.wienernetze_api.get_meter_reader()
         _LOGGER.debug(response)
-        data[ATTR_METER_READER] = response["meterReadings"][0]["value"] / 1000
+        if (reading := decode_meter_readings(response)) is not None:
+            data[ATTR_METER_READER] = reading
 
     async def _update_consumptions(self, data):
         _LOGGER.debug("_update_consumptions()")
-        await self._set_default_meterreader()
         response = await self.wienernetze_api.get_consumptions()
         _LOGGER.debug(response)
-        if response is not None and hasattr(response, "get"):
-            if response.get("consumptionYesterday") is not None:
-                consumptionYesterday = response.get("consumptionYesterday")["value"]
-                if consumptionYesterday is not None:
-                    data[ATTR_CONSUMPTION_YESTERDAY] = consumptionYesterday / 1000
-            if response.get("consumptionDayBeforeYesterday") is not None:
-                consumptionDayBeforeYesterday = response.get("consumptionDayBeforeYesterday")["value"]
-                if consumptionDayBeforeYesterday is not None:
-                    data[ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY] = consumptionDayBeforeYesterday / 1000
-
-    async def _async_update_data(self) -> dict[str, Any]:
-        """Fetch data."""
-        data: dict[str, Any] = {}
+        consumptions = decode_consumptions(response)
+        if consumptions.yesterday is not None:
+            data[ATTR_CONSUMPTION_YESTERDAY] = consumptions.yesterday
+        if consumptions.day_before_yesterday is not None:
+            data[ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY] = consumptions.day_before_yesterday
+
+    def _is_parsed(self, meter_reader: str, kind: str, response) -> bool:
+        """Return true if this response object was parsed for the meter before."""
+        key = (meter_reader, kind)
+        if self._parsed_responses.get(key) is response:
+            return True
+        self._parsed_responses[key] = response
+        return False
+
+    async def _update_meterreader_addressed(self, meter_reader, customer_id, data):
+        _LOGGER.debug("_update_meterreader_addressed()")
+        today = datetime.now(dt_util.get_time_zone(TIMEZONE))
+        response = await self.wienernetze_api.get_meter_values(
+            meter_reader,
+            customer_id,
+            VALUE_TYPE_METER_READ,
+            today - timedelta(days=7),
+            today,
+        )
+        if self._is_parsed(meter_reader, VALUE_TYPE_METER_READ, response):
+            return
+        _LOGGER.debug(response)
+        if messwerte := decode_messwerte(response):
+            data[ATTR_METER_READER] = messwerte[-1].value
+
+    async def _update_consumptions_addressed(self, meter_reader, customer_id, data):
+        _LOGGER.debug("_update_consumptions_addressed()")
+        timezone = dt_util.get_time_zone(TIMEZONE)
+        today = datetime.now(timezone)
+        response = await self.wienernetze_api.get_meter_values(
+            meter_reader,
+            customer_id,
+            VALUE_TYPE_DAY,
+            today - timedelta(days=3),
+            today,
+        )
+        if self._is_parsed(meter_reader, VALUE_TYPE_DAY, response):
+            return
+        _LOGGER.debug(response)
+        days = {
+            dt_util.utc_from_timestamp(messwert.start).astimezone(timezone).date(): messwert.value
+            for messwert in decode_messwerte(response)
+        }
+        yesterday = today.date() - timedelta(days=1)
+        if yesterday in days:
+            data[ATTR_CONSUMPTION_YESTERDAY] = days[yesterday]
+        if yesterday - timedelta(days=1) in days:
+            data[ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY] = days[yesterday - timedelta(days=1)]
+
+    async def _gather_updates(self, meter_reader: str, *updates) -> None:
+        """Run the reads of a meter and fail only if all of them failed."""
+        results = await asyncio.gather(*updates, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        for error in errors:
+            if isinstance(error, aiohttp.ClientResponseError) and error.status == 404:
+                raise error
+            _LOGGER.warning(
+                "Could not update WienerNetze data of %s: %s", meter_reader, error
+            )
+        if len(errors) == len(results):
+            raise errors[0]
+
+    async def _update_meter(self, meter_reader: str, customer_id: str, data) -> None:
+        """Fetch one meter, keeping the last values of a failing endpoint."""
+        if meter_reader not in self._default_meter_readers:
+            try:
+                await self._gather_updates(
+                    meter_reader,
+                    self._update_meterreader_addressed(meter_reader, customer_id, data),
+                    self._update_consumptions_addressed(meter_reader, customer_id, data),
+                )
+                return
+            except aiohttp.ClientResponseError as error:
+                if error.status != 404:
+                    raise
+                _LOGGER.info(
+                    "Meter addressed endpoints not available for %s, using the default meter",
+                    meter_reader,
+                )
+                self._default_meter_readers.add(meter_reader)
+
+        # the default meter is server side state, so these meters are read
+        # one after the other
+        async with self._default_meter_lock:
+            await self._set_default_meterreader(meter_reader, customer_id)
+            await self._gather_updates(
+                meter_reader,
+                self._update_meterreader(data),
+                self._update_consumptions(data),
+            )
+
+    async def _async_for_meters(
+        self, action: str, calls: dict[str, Awaitable[_T]]
+    ) -> dict[str, _T]:
+        """Await one call per meter concurrently and return the successful results.
+
+        A failing meter is logged and left out, it does not fail the others.
+        """
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        succeeded = {}
+        for meter_reader, result in zip(calls, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning("Could not %s of %s: %s", action, meter_reader, result)
+            else:
+                succeeded[meter_reader] = result
+        return succeeded
+
+    async def _async_import_statistics(self) -> None:
+        """Import the new hourly consumption of all meters."""
+        await self._async_for_meters(
+            "import statistics",
+            {
+                meter_reader: importer.async_import()
+                for meter_reader, importer in self._importers.items()
+            },
+        )
+
+    def coverage_gaps(self) -> list[int]:
+        """Return the number of holes in the imported statistics of every meter."""
+        return [importer.gaps for importer in self._importers.values()]
+
+    async def async_backfill(self, meter_reader: str, start: datetime, end: datetime) -> None:
+        """Import the history of a meter into the statistics."""
+        _LOGGER.info("Backfilling %s from %s to %s", meter_reader, start, end)
+        # backfill requests wait behind every refresh
+        token = PRIORITY.set(PRIORITY_BACKFILL)
+        try:
+            await self._importers[meter_reader].async_backfill(start, end)
+        except Exception as error:  # pylint: disable=broad-except
+            _LOGGER.error("Backfill of %s failed: %s", meter_reader, error)
+        else:
+            _LOGGER.info("Backfill of %s done", meter_reader)
+        finally:
+            PRIORITY.reset(token)
+
+    async def async_export(
+        self,
+        meter_reader: str,
+        start: datetime,
+        end: datetime,
+        path: str,
+        file_format: str,
+        resolution: str,
+    ) -> int:
+        """Export the intervals of a meter to a file, return the rows written."""
+        _LOGGER.info("Exporting %s from %s to %s into %s", meter_reader, start, end, path)
+        # like a backfill an export must not delay the refreshes
+        token = PRIORITY.set(PRIORITY_BACKFILL)
+        try:
+            return await async_export(
+                self.hass,
+                self.wienernetze_api,
+                meter_reader,
+                self.meters[meter_reader],
+                start,
+                end,
+                path,
+                file_format,
+                resolution,
+            )
+        finally:
+            PRIORITY.reset(token)
+
+    async def _async_update_engines(
+        self,
+        action: str,
+        engines: dict[str, HourlyEngine],
+        data: dict[str, dict[str, Any]],
+        now: datetime,
+    ) -> None:
+        """Pass the imported hours of all meters to engines and add their values."""
+        results = await self._async_for_meters(
+            action,
+            {
+                meter_reader: engine.async_update(
+                    self._importers[meter_reader].high_water_mark,
+                    now,
+                    self._importers[meter_reader].revised_from,
+                )
+                for meter_reader, engine in engines.items()
+                if meter_reader in data
+            },
+        )
+        for meter_reader, values in results.items():
+            data[meter_reader].update(values)
+
+    async def _async_update_data(self) -> dict[str, dict[str, Any]]:
+        """Fetch data of all meters and record the duration and requests."""
+        metrics = self.wienernetze_api.metrics
+        requests, failures = metrics.requests, metrics.failures
+        start = time.monotonic()
+        try:
+            with metrics.measure("refresh", request=False):
+                return await self._async_update_meters()
+        finally:
+            self.last_refresh = {
+                "duration": round(time.monotonic() - start, 3),
+                "requests": metrics.requests - requests,
+                "failures": metrics.failures - failures,
+            }
+            async_dispatcher_send(self.hass, SIGNAL_REFRESHED.format(self.username))
+
+    async def _async_update_meters(self) -> dict[str, dict[str, Any]]:
+        """Fetch data of all meters in one batch."""
+        data: dict[str, dict[str, Any]] = {}
         await self._login()
-        await self._update_meterreader(data)
-        await self._update_consumptions(data)
+        meters = list(self.meters.items())
+        # start from the last values so a failing endpoint keeps its sensors
+        for meter_reader, _ in meters:
+            data[meter_reader] = dict((self.data or {}).get(meter_reader, {}))
+        results = await asyncio.gather(
+            *(
+                self._update_meter(meter_reader, customer_id, data[meter_reader])
+                for meter_reader, customer_id in meters
+            ),
+            return_exceptions=True,
+        )
+        errors = []
+        for (meter_reader, _), result in zip(meters, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(
+                    "Could not update WienerNetze meter %s: %s", meter_reader, result
+                )
+                errors.append(result)
+                if not data[meter_reader]:
+                    del data[meter_reader]
+        if errors and len(errors) == len(meters):
+            raise UpdateFailed(f"Error fetching WienerNetze data: {errors[0]}") from errors[0]
+
+        await self._async_import_statistics()
+        now = dt_util.now()
+        for meter_reader, meter_data in data.items():
+            if (engine := self._aggregates.get(meter_reader)) is not None:
+                meter_data.update(engine.compute(now))
+        await self._async_update_engines("update costs", self._costs, data, now)
+        await self._async_update_engines("update the load profile", self._profiles, data, now)
+        for importer in self._importers.values():
+            importer.revised_from = None
+        await self._async_update_schedule(data)
 
         _LOGGER.debug(data)
         return data
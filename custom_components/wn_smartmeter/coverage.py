@@ -0,0 +1,79 @@
+"""Index of the time ranges a meter has intervals for."""
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+
+
+class Coverage:
+    """Sorted, disjoint [start, end) ranges of epoch seconds.
+
+    Touching ranges are merged, so contiguous data is a single range and
+    the index only grows with the number of holes.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, ranges: Iterable[Iterable[int]] = ()) -> None:
+        """Initialize the index with ranges."""
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        """Return the number of ranges."""
+        return len(self.starts)
+
+    @property
+    def first(self) -> int | None:
+        """Return the start of the first range."""
+        return self.starts[0] if self.starts else None
+
+    def add(self, start: int, end: int) -> None:
+        """Mark [start, end) as covered."""
+        if start >= end:
+            return
+        low = bisect_left(self.ends, start)
+        high = bisect_right(self.starts, end)
+        if low < high:
+            start = min(start, self.starts[low])
+            end = max(end, self.ends[high - 1])
+        self.starts[low:high] = [start]
+        self.ends[low:high] = [end]
+
+    def missing(self, start: int, end: int) -> list[tuple[int, int]]:
+        """Return the ranges in [start, end) that are not covered."""
+        result = []
+        cursor = start
+        index = bisect_right(self.ends, start)
+        while index < len(self.starts) and self.starts[index] < end:
+            if self.starts[index] > cursor:
+                result.append((cursor, self.starts[index]))
+            cursor = max(cursor, self.ends[index])
+            index += 1
+        if cursor < end:
+            result.append((cursor, end))
+        return result
+
+    def as_list(self) -> list[list[int]]:
+        """Return the ranges for persisting them."""
+        return [[start, end] for start, end in zip(self.starts, self.ends)]
+
+
+def coalesce(
+    ranges: Iterable[tuple[int, int]], max_gap: int, max_length: int
+) -> list[tuple[int, int]]:
+    """Merge ranges into the fewest request windows.
+
+    Ranges less than max_gap apart share a window, and no window is longer
+    than max_length.
+    """
+    windows: list[tuple[int, int]] = []
+    for start, end in ranges:
+        if windows and start - windows[-1][1] <= max_gap:
+            start = windows.pop()[0]
+        while end - start > max_length:
+            windows.append((start, start + max_length))
+            start += max_length
+        windows.append((start, end))
+    return windows
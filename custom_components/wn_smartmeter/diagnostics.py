@@ -0,0 +1,37 @@
+"""Diagnostics support for WienerNetze."""
+from __future__ import annotations
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .coordinator import WienerNetzeUpdateCoordinator
+from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD, CONF_METER_READER, CONF_CUSTOMER_ID
+
+# the entry title and unique id are the meter reader
+TO_REDACT = {
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_METER_READER,
+    CONF_CUSTOMER_ID,
+    "title",
+    "unique_id",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics of a config entry and the client of its account."""
+    coordinator: WienerNetzeUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    return {
+        "entry": async_redact_data(config_entry.as_dict(), TO_REDACT),
+        "meters": len(coordinator.meters),
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": str(coordinator.update_interval),
+        "last_refresh": coordinator.last_refresh,
+        "coverage_gaps": coordinator.coverage_gaps(),
+        "api": coordinator.wienernetze_api.diagnostics(),
+        "scheduler": coordinator.scheduler.as_dict(),
+    }
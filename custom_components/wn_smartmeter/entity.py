@@ -5,6 +5,7 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .coordinator import WienerNetzeUpdateCoordinator
+from .const import CONF_METER_READER
 
 
 class WienerNetzeEntity(CoordinatorEntity[WienerNetzeUpdateCoordinator]):
@@ -21,3 +22,9 @@ class WienerNetzeEntity(CoordinatorEntity[WienerNetzeUpdateCoordinator]):
         self._attr_name = description.name
         self._attr_unique_id = f"{config_entry.entry_id}{description.key.lower()}"
         self.entity_description = description
+        self.meter_reader = config_entry.data[CONF_METER_READER]
+
+    @property
+    def meter_data(self) -> dict:
+        """Return the coordinator data of this entity's meter."""
+        return (self.coordinator.data or {}).get(self.meter_reader, {})
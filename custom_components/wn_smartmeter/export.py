@@ -0,0 +1,141 @@
+"""Export of the interval data of a meter to CSV or Parquet files."""
+from __future__ import annotations
+import csv
+import logging
+import os
+from importlib.util import find_spec
+from datetime import datetime, timezone
+
+from homeassistant.core import HomeAssistant
+
+from .api import WienerNetzeAPI
+from .api.models import Measurement, decode_verbrauch
+from .statistics import aligned_windows
+from .const import EXPORT_BATCH_ROWS, EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET
+
+_LOGGER = logging.getLogger(__name__)
+
+COLUMNS = ("start", "end", "kwh")
+
+
+def _isoformat(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class CsvWriter:
+    """Writes batches of measurements as CSV rows."""
+
+    def __init__(self, path: str) -> None:
+        """Open the file and write the header."""
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, batch: list[Measurement]) -> None:
+        """Append a batch."""
+        self._writer.writerows(
+            (_isoformat(measurement.start), _isoformat(measurement.end), measurement.value)
+            for measurement in batch
+        )
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes batches of measurements as row groups of a Parquet file."""
+
+    def __init__(self, path: str) -> None:
+        """Open the file, pyarrow is only imported by the first Parquet export."""
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("start", pa.timestamp("s", tz="UTC")),
+                ("end", pa.timestamp("s", tz="UTC")),
+                ("kwh", pa.float64()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, batch: list[Measurement]) -> None:
+        """Append a batch as one row group."""
+        pa = self._pa
+        self._writer.write_table(
+            pa.Table.from_arrays(
+                [
+                    pa.array([measurement.start for measurement in batch], self._schema[0].type),
+                    pa.array([measurement.end for measurement in batch], self._schema[1].type),
+                    pa.array([measurement.value for measurement in batch], pa.float64()),
+                ],
+                schema=self._schema,
+            )
+        )
+
+    def close(self) -> None:
+        """Write the footer and close the file."""
+        self._writer.close()
+
+
+WRITERS = {EXPORT_FORMAT_CSV: CsvWriter}
+if find_spec("pyarrow") is not None:
+    WRITERS[EXPORT_FORMAT_PARQUET] = ParquetWriter
+
+
+async def async_export(
+    hass: HomeAssistant,
+    api: WienerNetzeAPI,
+    meter_reader: str,
+    customer_id: str,
+    start: datetime,
+    end: datetime,
+    path: str,
+    file_format: str,
+    resolution: str,
+) -> int:
+    """Write the intervals of a meter in [start, end) to a file, return the rows.
+
+    The range is fetched window by window, from the response cache where it
+    has the window but without adding to it, and written in batches of
+    EXPORT_BATCH_ROWS in the executor, so memory does not grow with the
+    range. The file is written next to path and only replaces it when the
+    export is complete.
+    """
+    partial = f"{path}.part"
+    writer = await hass.async_add_executor_job(WRITERS[file_format], partial)
+    batch: list[Measurement] = []
+    rows = 0
+    try:
+        for window_start, window_end in aligned_windows(start, end):
+            window_start = max(window_start, start)
+            response = await api.get_consumption(
+                meter_reader,
+                customer_id,
+                window_start,
+                window_end,
+                resolution,
+                cache_store=False,
+            )
+            low, high = int(window_start.timestamp()), int(window_end.timestamp())
+            for measurement in decode_verbrauch(response):
+                # windows are disjoint, intervals at their edges belong to one only
+                if low <= measurement.start < high:
+                    batch.append(measurement)
+                    if len(batch) == EXPORT_BATCH_ROWS:
+                        await hass.async_add_executor_job(writer.write, batch)
+                        rows += len(batch)
+                        batch = []
+        if batch:
+            await hass.async_add_executor_job(writer.write, batch)
+            rows += len(batch)
+        await hass.async_add_executor_job(writer.close)
+    except BaseException:
+        await hass.async_add_executor_job(writer.close)
+        await hass.async_add_executor_job(os.remove, partial)
+        raise
+    await hass.async_add_executor_job(os.replace, partial, path)
+    _LOGGER.debug("exported %s rows of %s to %s", rows, meter_reader, path)
+    return rows
@@ -0,0 +1,138 @@
+"""Base of the engines that process the imported hours of a meter."""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .series import IntervalSeries
+from .const import DOMAIN, COVERAGE_REFETCH_DAYS
+
+# hours that are kept to compare them when a refill revised them
+RECENT_SECONDS = (COVERAGE_REFETCH_DAYS + 1) * 86400
+
+
+class HourlyEngine(ABC):
+    """Processes the hours of a series after the persisted end of the last run.
+
+    Only the intervals between the end of the last run and the end of the
+    imported hours are read, so months of data are never read twice and
+    the state survives a restart. The sums of the recent hours are kept as
+    well, so hours a refill of the statistics revised afterwards can be
+    compared and passed on as changes.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        meter_reader: str,
+        series: IntervalSeries,
+        version: int,
+        name: str,
+    ) -> None:
+        """Initialize the engine with a store named after the meter."""
+        self.hass = hass
+        self.meter_reader = meter_reader
+        self.series = series
+        self._store: Store[dict[str, Any]] = Store(
+            hass, version, f"{DOMAIN}.{meter_reader.lower()}_{name}"
+        )
+        self._state: dict[str, Any] | None = None
+
+    async def _async_load(self) -> dict[str, Any]:
+        if self._state is None:
+            state = await self._store.async_load() or {}
+            await self._async_setup(state)
+            self._state = state
+        return self._state
+
+    async def _async_setup(self, state: dict[str, Any]) -> None:
+        """Prepare the engine once the persisted state is loaded."""
+
+    async def async_update(
+        self, until: datetime | None, now: datetime, revised_from: int | None = None
+    ) -> dict[str, float]:
+        """Process the hours up to until and return the sensor values.
+
+        revised_from is the start of the first hour a refill of the series
+        changed, the hours from there to the end of the last run are
+        compared with what was processed before.
+        """
+        state = await self._async_load()
+        start = state.get("until", self.series.first_timestamp)
+        save = False
+        if revised_from is not None and start is not None and revised_from < start:
+            self._revise(state, revised_from, start)
+            save = True
+        if until is not None and start is not None and start < until.timestamp():
+            timestamps, values = self.series.range(start, int(until.timestamp()))
+            if timestamps:
+                hours = self._hours(timestamps, values)
+                self._add_hours(state, hours)
+                self._remember(state, hours, int(until.timestamp()))
+            state["until"] = int(until.timestamp())
+            save = True
+        if save:
+            await self._store.async_save(state)
+        return self._sensor_values(state, now)
+
+    def _remember(self, state: dict[str, Any], hours: dict[int, float], until: int) -> None:
+        """Keep the sums of the recent hours and drop the older ones."""
+        recent = state.setdefault("recent", {})
+        # hours before the first remembered run were processed but are not known
+        state.setdefault("recent_since", min(hours))
+        recent.update((str(hour), value) for hour, value in hours.items())
+        oldest = until - RECENT_SECONDS
+        for hour in [hour for hour in recent if int(hour) < oldest]:
+            del recent[hour]
+        state["recent_since"] = max(state["recent_since"], oldest)
+
+    def _revise(self, state: dict[str, Any], since: int, until: int) -> None:
+        """Pass on the hours in [since, until) that differ from the processed ones."""
+        if "recent_since" not in state:
+            return
+        since = max(since - since % 3600, state["recent_since"])
+        recent = state["recent"]
+        timestamps, values = self.series.range(since, until)
+        changed = {
+            hour: (recent.get(str(hour)), value)
+            for hour, value in self._hours(timestamps, values).items()
+            if recent.get(str(hour)) != value
+        }
+        if not changed:
+            return
+        recent.update((str(hour), value) for hour, (_, value) in changed.items())
+        self._revise_hours(state, changed)
+
+    def _hours(self, timestamps: array, values: array) -> dict[int, float]:
+        """Return the sum of the interval values of every hour."""
+        hours: dict[int, float] = {}
+        for timestamp, value in zip(timestamps, self._values(timestamps, values)):
+            hour = timestamp - timestamp % 3600
+            hours[hour] = hours.get(hour, 0.0) + value
+        return hours
+
+    def _values(self, timestamps: array, values: array) -> Sequence[float]:
+        """Return what the engine sums up per hour, the kWh by default."""
+        return values
+
+    @abstractmethod
+    def _add_hours(self, state: dict[str, Any], hours: dict[int, float]) -> None:
+        """Add the sums of new hours to the state."""
+
+    @abstractmethod
+    def _revise_hours(
+        self, state: dict[str, Any], changed: dict[int, tuple[float | None, float]]
+    ) -> None:
+        """Apply the changes of processed hours, the sums before and after.
+
+        The sum before is None for an hour that was missing so far.
+        """
+
+    @abstractmethod
+    def _sensor_values(self, state: dict[str, Any], now: datetime) -> dict[str, float]:
+        """Return the sensor values of the state."""
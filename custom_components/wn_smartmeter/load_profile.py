@@ -0,0 +1,236 @@
+"""Streaming hour of week statistics of a meter's consumption."""
+from __future__ import annotations
+import logging
+import math
+from bisect import insort
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .hourly import HourlyEngine
+from .series import IntervalSeries
+from .const import (
+    TIMEZONE,
+    PROFILE_STORAGE_VERSION,
+    PROFILE_EWMA_ALPHA,
+    PROFILE_QUANTILE,
+    PROFILE_MIN_SAMPLES,
+    ATTR_ANOMALY_SCORE,
+    ATTR_BASE_LOAD,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+
+
+class P2Quantile:
+    """Estimate of a quantile in constant memory with the P² algorithm.
+
+    Five markers track the minimum, the quantile, the maximum and two points
+    in between; every observation moves them by at most one position. Five
+    observations cannot place a marker at a low quantile, so the first
+    5 / min(p, 1 - p) observations are kept sorted and the markers start at
+    their ranks in that sample.
+    """
+
+    __slots__ = ("quantile", "heights", "positions", "desired", "increments", "sample_size")
+
+    def __init__(self, quantile: float) -> None:
+        """Initialize an empty estimate."""
+        self.quantile = quantile
+        # the sorted observations until the markers are placed, then the markers
+        self.heights: list[float] = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5.0]
+        self.increments = [0.0, quantile / 2, quantile, (1 + quantile) / 2, 1.0]
+        self.sample_size = max(5, math.ceil(5 / min(quantile, 1 - quantile)))
+
+    @property
+    def _placed(self) -> bool:
+        # the last marker is at the number of observations, beyond five once placed
+        return self.positions[4] > 5
+
+    def _place(self) -> None:
+        """Place the markers at their desired ranks in the sorted sample."""
+        sample = self.heights
+        self.desired = [1 + (len(sample) - 1) * increment for increment in self.increments]
+        self.positions = [float(round(desired)) for desired in self.desired]
+        self.heights = [sample[int(position) - 1] for position in self.positions]
+
+    def add(self, value: float) -> None:
+        """Add an observation."""
+        heights = self.heights
+        if not self._placed:
+            insort(heights, value)
+            if len(heights) >= self.sample_size:
+                self._place()
+            return
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(index for index in range(4) if value < heights[index + 1])
+        for index in range(cell + 1, 5):
+            self.positions[index] += 1
+        for index in range(5):
+            self.desired[index] += self.increments[index]
+        for index in (1, 2, 3):
+            self._adjust(index)
+
+    def _adjust(self, index: int) -> None:
+        heights, positions = self.heights, self.positions
+        offset = self.desired[index] - positions[index]
+        if not (
+            (offset >= 1 and positions[index + 1] - positions[index] > 1)
+            or (offset <= -1 and positions[index - 1] - positions[index] < -1)
+        ):
+            return
+        step = 1 if offset > 0 else -1
+        # piecewise parabolic prediction, linear if it leaves the neighbours
+        height = heights[index] + step / (positions[index + 1] - positions[index - 1]) * (
+            (positions[index] - positions[index - 1] + step)
+            * (heights[index + 1] - heights[index])
+            / (positions[index + 1] - positions[index])
+            + (positions[index + 1] - positions[index] - step)
+            * (heights[index] - heights[index - 1])
+            / (positions[index] - positions[index - 1])
+        )
+        if not heights[index - 1] < height < heights[index + 1]:
+            height = heights[index] + step * (heights[index + step] - heights[index]) / (
+                positions[index + step] - positions[index]
+            )
+        heights[index] = height
+        positions[index] += step
+
+    @property
+    def value(self) -> float | None:
+        """Return the estimate, exact until the markers are placed."""
+        if not self.heights:
+            return None
+        if not self._placed:
+            return self.heights[round(self.quantile * (len(self.heights) - 1))]
+        return self.heights[2]
+
+    def as_list(self) -> list:
+        """Return the state for persisting it."""
+        return [self.heights, self.positions, self.desired]
+
+    @classmethod
+    def from_list(cls, quantile: float, data: list) -> P2Quantile:
+        """Restore an estimate from as_list."""
+        estimate = cls(quantile)
+        estimate.heights, estimate.positions, estimate.desired = data
+        return estimate
+
+
+class HourStatistics:
+    """Running statistics of the consumption in one hour of the week.
+
+    Welford's algorithm keeps the mean and variance, the EWMA follows
+    seasonal drift and the quantile estimate the low end, all in O(1).
+    """
+
+    __slots__ = ("count", "mean", "m2", "ewma", "low")
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = 0.0
+        self.low = P2Quantile(PROFILE_QUANTILE)
+
+    def add(self, value: float) -> None:
+        """Add the consumption of one hour."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.count == 1:
+            self.ewma = value
+        else:
+            self.ewma += PROFILE_EWMA_ALPHA * (value - self.ewma)
+        self.low.add(value)
+
+    @property
+    def std(self) -> float:
+        """Return the sample standard deviation."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def score(self, value: float) -> float | None:
+        """Return how many standard deviations value is above the EWMA."""
+        if self.count < PROFILE_MIN_SAMPLES or not (std := self.std):
+            return None
+        return (value - self.ewma) / std
+
+    def as_list(self) -> list:
+        """Return the state for persisting it."""
+        return [self.count, self.mean, self.m2, self.ewma, self.low.as_list()]
+
+    @classmethod
+    def from_list(cls, data: list) -> HourStatistics:
+        """Restore statistics from as_list."""
+        statistics = cls()
+        statistics.count, statistics.mean, statistics.m2, statistics.ewma, low = data
+        statistics.low = P2Quantile.from_list(PROFILE_QUANTILE, low)
+        return statistics
+
+
+class LoadProfileEngine(HourlyEngine):
+    """Keeps the hour of week statistics of a series and scores new hours."""
+
+    def __init__(self, hass: HomeAssistant, meter_reader: str, series: IntervalSeries) -> None:
+        """Initialize the engine."""
+        super().__init__(hass, meter_reader, series, PROFILE_STORAGE_VERSION, "profile")
+        self.hours: list[HourStatistics] = []
+
+    async def _async_setup(self, state: dict[str, Any]) -> None:
+        self.hours = [HourStatistics.from_list(data) for data in state.get("hours", [])] or [
+            HourStatistics() for _ in range(HOURS_PER_WEEK)
+        ]
+
+    def _hour_of_week(self, hour: int) -> HourStatistics:
+        local = dt_util.utc_from_timestamp(hour).astimezone(dt_util.get_time_zone(TIMEZONE))
+        return self.hours[local.weekday() * 24 + local.hour]
+
+    def _add_hours(self, state: dict[str, Any], hours: dict[int, float]) -> None:
+        for hour in sorted(hours):
+            statistics = self._hour_of_week(hour)
+            # score against the statistics before the hour is part of them
+            state["score"] = statistics.score(hours[hour])
+            statistics.add(hours[hour])
+        state["hours"] = [statistics.as_list() for statistics in self.hours]
+        _LOGGER.debug("%s hours added to the load profile of %s", len(hours), self.meter_reader)
+
+    def _revise_hours(
+        self, state: dict[str, Any], changed: dict[int, tuple[float | None, float]]
+    ) -> None:
+        # an observation cannot be taken back, only hours missing so far are added
+        missing = sorted(hour for hour, (before, _) in changed.items() if before is None)
+        for hour in missing:
+            self._hour_of_week(hour).add(changed[hour][1])
+        state["hours"] = [statistics.as_list() for statistics in self.hours]
+        _LOGGER.debug(
+            "%s missing hours added to the load profile of %s, %s changed hours kept",
+            len(missing),
+            self.meter_reader,
+            len(changed) - len(missing),
+        )
+
+    def _sensor_values(self, state: dict[str, Any], now: datetime) -> dict[str, float]:
+        values = {}
+        if state.get("score") is not None:
+            values[ATTR_ANOMALY_SCORE] = round(state["score"], 2)
+        lows = [
+            hour.low.value for hour in self.hours if hour.count >= PROFILE_MIN_SAMPLES
+        ]
+        if lows:
+            # kWh per hour is the average load in kW
+            values[ATTR_BASE_LOAD] = min(lows)
+        return values
@@ -5,12 +5,14 @@ from collections.abc import Callable
 from dataclasses import dataclass
 
 from homeassistant.components.sensor import (
-    SensorEntity,
+    RestoreSensor,
+    SensorDeviceClass,
     SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.core import HomeAssistant
-from homeassistant.const import UnitOfEnergy
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfPower, UnitOfTime
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.typing import StateType
@@ -22,6 +24,21 @@ from .const import (
     ATTR_METER_READER,
     ATTR_CONSUMPTION_YESTERDAY,
     ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY,
+    ATTR_CONSUMPTION_WEEK_TO_DATE,
+    ATTR_CONSUMPTION_MONTH_TO_DATE,
+    ATTR_CONSUMPTION_DAILY_AVERAGE,
+    ATTR_PEAK_HOUR_CONSUMPTION,
+    ATTR_NIGHT_BASE_LOAD,
+    ATTR_COST_YESTERDAY,
+    ATTR_COST_MONTH_TO_DATE,
+    ATTR_LAST_REFRESH_DURATION,
+    ATTR_REQUESTS_PER_REFRESH,
+    ATTR_REQUEST_FAILURES,
+    ATTR_ANOMALY_SCORE,
+    ATTR_BASE_LOAD,
+    CONF_TARIFF_TYPE,
+    SIGNAL_REFRESHED,
+    TARIFF_NONE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -33,15 +50,18 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ):
     """Set up sensor platform."""
-    coordinator: WienerNetzeUpdateCoordinator = hass.data[DOMAIN]
+    coordinator: WienerNetzeUpdateCoordinator = hass.data[DOMAIN][config.entry_id]
     _LOGGER.debug("setup")
     entities = []
+    has_tariff = config.options.get(CONF_TARIFF_TYPE, TARIFF_NONE) != TARIFF_NONE
     for description in SENSORS:
+        if description.currency and not has_tariff:
+            continue
         entity = WienerNetzeSensorEntity(coordinator, description, config)
         coordinator.entities.append(entity)
         entities.append(entity)
 
-    async_add_entities(entities, True)
+    async_add_entities(entities)
 
 
 @dataclass
@@ -50,6 +70,10 @@ class WienerNetzeSensorEntityDescription(SensorEntityDescription):
 
     exists_fn: Callable[[list[str]], bool] = lambda _: True
     entity_registry_enabled_default: bool = True
+    # the unit is the currency of the instance
+    currency: bool = False
+    # account wide values that are read from the coordinator after every refresh
+    value_fn: Callable[[WienerNetzeUpdateCoordinator], StateType] | None = None
 
 
 SENSORS: tuple[WienerNetzeSensorEntityDescription, ...] = (
@@ -77,13 +101,144 @@ SENSORS: tuple[WienerNetzeSensorEntityDescription, ...] = (
         exists_fn=lambda entities: ATTR_CONSUMPTION_DAY_BEFORE_YESTERDAY in entities,
         icon="mdi:flash",
     ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_CONSUMPTION_WEEK_TO_DATE,
+        name="WienerNetze Consumption this week",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        exists_fn=lambda entities: ATTR_CONSUMPTION_WEEK_TO_DATE in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_CONSUMPTION_MONTH_TO_DATE,
+        name="WienerNetze Consumption this month",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:flash",
+        exists_fn=lambda entities: ATTR_CONSUMPTION_MONTH_TO_DATE in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_CONSUMPTION_DAILY_AVERAGE,
+        name="WienerNetze Consumption daily average 30 days",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:chart-line",
+        exists_fn=lambda entities: ATTR_CONSUMPTION_DAILY_AVERAGE in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_PEAK_HOUR_CONSUMPTION,
+        name="WienerNetze Peak hour consumption 30 days",
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:chart-bell-curve",
+        exists_fn=lambda entities: ATTR_PEAK_HOUR_CONSUMPTION in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_NIGHT_BASE_LOAD,
+        name="WienerNetze Night base load",
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:weather-night",
+        exists_fn=lambda entities: ATTR_NIGHT_BASE_LOAD in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_BASE_LOAD,
+        name="WienerNetze Base load",
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:transmission-tower",
+        exists_fn=lambda entities: ATTR_BASE_LOAD in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_ANOMALY_SCORE,
+        name="WienerNetze Anomaly score",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:chart-timeline-variant-shimmer",
+        exists_fn=lambda entities: ATTR_ANOMALY_SCORE in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_COST_YESTERDAY,
+        name="WienerNetze Cost yesterday",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        currency=True,
+        exists_fn=lambda entities: ATTR_COST_YESTERDAY in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_COST_MONTH_TO_DATE,
+        name="WienerNetze Cost this month",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        icon="mdi:cash",
+        currency=True,
+        exists_fn=lambda entities: ATTR_COST_MONTH_TO_DATE in entities,
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_LAST_REFRESH_DURATION,
+        name="WienerNetze Last refresh duration",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        icon="mdi:timer-outline",
+        value_fn=lambda coordinator: coordinator.last_refresh.get("duration"),
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_REQUESTS_PER_REFRESH,
+        name="WienerNetze Requests per refresh",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        icon="mdi:swap-vertical",
+        value_fn=lambda coordinator: coordinator.last_refresh.get("requests"),
+    ),
+    WienerNetzeSensorEntityDescription(
+        key=ATTR_REQUEST_FAILURES,
+        name="WienerNetze Request failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        icon="mdi:alert-circle-outline",
+        value_fn=lambda coordinator: coordinator.wienernetze_api.metrics.failures,
+    ),
 )
 
 
-class WienerNetzeSensorEntity(WienerNetzeEntity, SensorEntity):
+class WienerNetzeSensorEntity(WienerNetzeEntity, RestoreSensor):
     """WienerNetze sensor entity definition."""
 
+    _restored_value: StateType = None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state until the first refresh is done."""
+        await super().async_added_to_hass()
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._restored_value = last_sensor_data.native_value
+        if self.entity_description.value_fn is not None:
+            # the coordinator only notifies listeners when the meter data changed
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass,
+                    SIGNAL_REFRESHED.format(self.coordinator.username),
+                    self.async_write_ha_state,
+                )
+            )
+
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        """Return the unit, the instance currency for cost sensors."""
+        if self.entity_description.currency:
+            return self.hass.config.currency
+        return super().native_unit_of_measurement
+
     @property
     def native_value(self) -> StateType:
         """Return the value reported by the sensor."""
-        return self.coordinator.data.get(self.entity_description.key, None)
+        if self.entity_description.value_fn is not None:
+            value = self.entity_description.value_fn(self.coordinator)
+            return value if value is not None else self._restored_value
+        return self.meter_data.get(self.entity_description.key, self._restored_value)
@@ -0,0 +1,83 @@
+"""Compact in-memory time series of meter intervals."""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+
+class IntervalSeries:
+    """Interval values of one meter in two parallel arrays.
+
+    Timestamps are epoch seconds of the interval start in an ``array('q')``,
+    values are kWh in an ``array('d')``, so a data point costs 16 bytes.
+    Appending in order is O(1), late values are inserted at their position
+    and range lookups are O(log n).
+    """
+
+    __slots__ = ("timestamps", "values", "resolution", "version")
+
+    def __init__(self, resolution: int = 3600) -> None:
+        """Initialize an empty series with the interval length in seconds."""
+        self.timestamps = array("q")
+        self.values = array("d")
+        self.resolution = resolution
+        # increases with every change, so derived values know when to update
+        self.version = 0
+
+    def __len__(self) -> int:
+        """Return the number of intervals."""
+        return len(self.timestamps)
+
+    @property
+    def first_timestamp(self) -> int | None:
+        """Return the start of the first interval."""
+        return self.timestamps[0] if self.timestamps else None
+
+    @property
+    def last_timestamp(self) -> int | None:
+        """Return the start of the last interval."""
+        return self.timestamps[-1] if self.timestamps else None
+
+    def add(self, timestamp: int, value: float) -> bool:
+        """Add or replace an interval, return true if the series changed."""
+        self.version += 1
+        if not self.timestamps or timestamp > self.timestamps[-1]:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            return True
+        index = bisect_left(self.timestamps, timestamp)
+        if index < len(self.timestamps) and self.timestamps[index] == timestamp:
+            if self.values[index] == value:
+                self.version -= 1
+                return False
+            self.values[index] = value
+            return True
+        self.timestamps.insert(index, timestamp)
+        self.values.insert(index, value)
+        return True
+
+    def extend(self, intervals: Iterable[tuple[int, float]]) -> int:
+        """Add intervals, return the number of added or changed ones."""
+        return sum(self.add(timestamp, value) for timestamp, value in intervals)
+
+    def bounds(self, start: int, end: int) -> tuple[int, int]:
+        """Return the index range of the intervals starting in [start, end)."""
+        return bisect_left(self.timestamps, start), bisect_left(self.timestamps, end)
+
+    def range(self, start: int, end: int) -> tuple[array, array]:
+        """Return copies of the timestamps and values in [start, end)."""
+        low, high = self.bounds(start, end)
+        return self.timestamps[low:high], self.values[low:high]
+
+    def sum(self, start: int, end: int) -> float:
+        """Return the sum of the values in [start, end)."""
+        low, high = self.bounds(start, end)
+        return sum(self.values[low:high])
+
+    def trim(self, before: int) -> None:
+        """Drop the intervals that start before a timestamp."""
+        index = bisect_left(self.timestamps, before)
+        if index:
+            del self.timestamps[:index]
+            del self.values[:index]
+            self.version += 1
@@ -0,0 +1,109 @@
+"""Services for WienerNetze."""
+from __future__ import annotations
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .coordinator import WienerNetzeUpdateCoordinator
+from .export import WRITERS
+from .const import (
+    DOMAIN,
+    CONF_METER_READER,
+    SERVICE_BACKFILL,
+    SERVICE_EXPORT,
+    EXPORT_FORMAT_CSV,
+    EXPORT_RESOLUTIONS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_PATH = "path"
+ATTR_FORMAT = "format"
+ATTR_RESOLUTION = "resolution"
+
+BACKFILL_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_METER_READER): cv.string,
+        vol.Required(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+    }
+)
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_METER_READER): cv.string,
+        vol.Required(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+        vol.Required(ATTR_PATH): cv.string,
+        vol.Optional(ATTR_FORMAT, default=EXPORT_FORMAT_CSV): vol.In(list(WRITERS)),
+        vol.Optional(ATTR_RESOLUTION, default=EXPORT_RESOLUTIONS[0]): vol.In(
+            EXPORT_RESOLUTIONS
+        ),
+    }
+)
+
+
+def _get_coordinator(hass: HomeAssistant, meter_reader: str) -> WienerNetzeUpdateCoordinator:
+    """Return the coordinator that reads a meter."""
+    for coordinator in hass.data.get(DOMAIN, {}).values():
+        if meter_reader in coordinator.meters:
+            return coordinator
+    raise HomeAssistantError(f"Meter reader {meter_reader} is not configured")
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services once."""
+    if hass.services.has_service(DOMAIN, SERVICE_BACKFILL):
+        return
+
+    async def async_backfill(call: ServiceCall) -> None:
+        """Import the history of a meter in the background."""
+        meter_reader = call.data[CONF_METER_READER]
+        coordinator = _get_coordinator(hass, meter_reader)
+        start = dt_util.start_of_local_day(call.data[ATTR_START])
+        end = dt_util.start_of_local_day(call.data.get(ATTR_END, dt_util.now().date()))
+        if start >= end:
+            raise HomeAssistantError("start must be before end")
+        hass.async_create_background_task(
+            coordinator.async_backfill(meter_reader, start, end),
+            f"{DOMAIN} backfill {meter_reader}",
+        )
+
+    async def async_export(call: ServiceCall) -> ServiceResponse:
+        """Write the intervals of a meter to a local file."""
+        meter_reader = call.data[CONF_METER_READER]
+        coordinator = _get_coordinator(hass, meter_reader)
+        start = dt_util.start_of_local_day(call.data[ATTR_START])
+        end = dt_util.start_of_local_day(call.data.get(ATTR_END, dt_util.now().date()))
+        if start >= end:
+            raise HomeAssistantError("start must be before end")
+        path = hass.config.path(call.data[ATTR_PATH])
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Writing to {path} is not allowed")
+        rows = await coordinator.async_export(
+            meter_reader,
+            start,
+            end,
+            path,
+            call.data[ATTR_FORMAT],
+            call.data[ATTR_RESOLUTION],
+        )
+        return {"path": path, "rows": rows}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BACKFILL, async_backfill, schema=BACKFILL_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT,
+        async_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
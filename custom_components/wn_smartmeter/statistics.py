@@ -0,0 +1,328 @@
+"""Long-term statistics import for WienerNetze."""
+from __future__ import annotations
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import WienerNetzeAPI
+from .api.models import decode_verbrauch
+from .coverage import Coverage, coalesce
+from .series import IntervalSeries
+from .const import (
+    DOMAIN,
+    STATISTICS_STORAGE_VERSION,
+    STATISTICS_BACKFILL_DAYS,
+    STATISTICS_WINDOW_DAYS,
+    BACKFILL_CONCURRENCY,
+    SERIES_WARMUP_DAYS,
+    SERIES_RETENTION_DAYS,
+    COVERAGE_REFETCH_DAYS,
+    COVERAGE_MAX_GAP,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def statistic_id(meter_reader: str) -> str:
+    """Return the external statistic id of a meter."""
+    return f"{DOMAIN}:{meter_reader.lower()}_consumption"
+
+
+def aligned_windows(
+    start: datetime, end: datetime, days: int = STATISTICS_WINDOW_DAYS
+) -> Iterator[tuple[datetime, datetime]]:
+    """Split [start, end) into windows on a fixed grid of local days.
+
+    The first window starts at the grid line before start, so the windows of
+    finalized days are the same on every run and can be served from cache.
+    """
+    ordinal = dt_util.as_local(start).date().toordinal() // days * days
+    window_start = dt_util.start_of_local_day(date.fromordinal(ordinal))
+    while window_start < end:
+        ordinal += days
+        window_end = min(dt_util.start_of_local_day(date.fromordinal(ordinal)), end)
+        yield window_start, window_end
+        window_start = window_end
+
+
+class WienerNetzeStatisticsImporter:
+    """Imports the hourly consumption of a meter as external statistics.
+
+    Fetched intervals go into the meter's IntervalSeries and the statistics
+    are built from it. The end of the last imported hour, the running
+    sum and the coverage of the fetched intervals are persisted, so every
+    run only requests the range that is missing since then and the recent
+    holes upstream may have filled in by now.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: WienerNetzeAPI,
+        meter_reader: str,
+        customer_id: str,
+        series: IntervalSeries,
+    ) -> None:
+        """Initialize the importer."""
+        self.hass = hass
+        self.api = api
+        self.meter_reader = meter_reader
+        self.customer_id = customer_id
+        self.series = series
+        self._store: Store[dict[str, Any]] = Store(
+            hass,
+            STATISTICS_STORAGE_VERSION,
+            f"{DOMAIN}.{meter_reader.lower()}_statistics",
+        )
+        self._state: dict[str, Any] | None = None
+        self._warmed_up = False
+        self.coverage = Coverage()
+        # start of the first hour a refill changed, until the engines caught up
+        self.revised_from: int | None = None
+
+    @property
+    def metadata(self) -> StatisticMetaData:
+        """Return the statistic metadata of the meter."""
+        return StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"WienerNetze {self.meter_reader} consumption",
+            source=DOMAIN,
+            statistic_id=statistic_id(self.meter_reader),
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+
+    async def _async_load(self) -> dict[str, Any]:
+        if self._state is None:
+            self._state = await self._store.async_load() or {}
+            self.coverage = Coverage(self._state.get("coverage", []))
+        return self._state
+
+    async def _async_save(self) -> None:
+        self._state["coverage"] = self.coverage.as_list()
+        await self._store.async_save(self._state)
+
+    @property
+    def gaps(self) -> int:
+        """Return the number of holes between the first and the last imported hour."""
+        if self.coverage.first is None or (last_end := self.high_water_mark) is None:
+            return 0
+        return len(self.coverage.missing(self.coverage.first, int(last_end.timestamp())))
+
+    @property
+    def high_water_mark(self) -> datetime | None:
+        """Return the end of the last imported hour."""
+        if not self._state or self._state.get("last_end") is None:
+            return None
+        return dt_util.parse_datetime(self._state["last_end"])
+
+    def _add_measurements(self, response) -> int | None:
+        """Add the intervals of a response to the series and the coverage."""
+        measurements = decode_verbrauch(response)
+        self.series.extend((measurement.start, measurement.value) for measurement in measurements)
+        for measurement in measurements:
+            self.coverage.add(measurement.start, measurement.end)
+        return max((measurement.end for measurement in measurements), default=None)
+
+    def add_response(self, response) -> None:
+        """Add a verbrauch response to the series and the statistics."""
+        last_end = self._add_measurements(response)
+        if last_end is not None:
+            # quarter hour values of the last hour may still be missing
+            self.add_hours(last_end - last_end % 3600)
+
+    def _hourly(self, hour: int, until: int, total: float) -> list[StatisticData]:
+        """Return the statistics of the hours of the series in [hour, until)."""
+        statistics = []
+        while hour < until:
+            low, high = self.series.bounds(hour, hour + 3600)
+            if low != high:
+                value = sum(self.series.values[low:high])
+                total += value
+                statistics.append(
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(hour), state=value, sum=total
+                    )
+                )
+            hour += 3600
+        return statistics
+
+    def add_hours(self, until: int) -> None:
+        """Add the complete hours of the series up to until to the statistics."""
+        state = self._state if self._state is not None else {}
+        last_end = self.high_water_mark
+        hour = (
+            int(last_end.timestamp())
+            if last_end is not None
+            else self.series.first_timestamp
+        )
+        if hour is None:
+            return
+        hour -= hour % 3600
+        statistics = self._hourly(hour, until, state.get("sum", 0.0))
+        if not statistics:
+            return
+        total = statistics[-1]["sum"]
+        async_add_external_statistics(self.hass, self.metadata, statistics)
+        if "first_start" not in state:
+            state["first_start"] = statistics[0]["start"].isoformat()
+            state["first_sum"] = statistics[0]["sum"] - statistics[0]["state"]
+        state["sum"] = total
+        state["last_end"] = (statistics[-1]["start"] + timedelta(hours=1)).isoformat()
+        self._state = state
+
+    @property
+    def first_start(self) -> datetime | None:
+        """Return the start of the first imported hour."""
+        if not self._state or self._state.get("first_start") is None:
+            return None
+        return dt_util.parse_datetime(self._state["first_start"])
+
+    async def async_backfill(self, start: datetime, end: datetime) -> None:
+        """Import the history before the first imported hour.
+
+        Windows are walked from new to old so the sums can count down from
+        the sum before the first imported hour, leaving imported rows as they
+        are. Progress is saved after every window, so calling it again with
+        the same range resumes where an interrupted run stopped.
+        """
+        await self._async_load()
+        if (first_start := self.first_start) is None:
+            raise ValueError(f"No statistics of {self.meter_reader} imported yet")
+        end = min(end, first_start)
+        windows = list(aligned_windows(start, end))
+        windows.reverse()
+        pending: deque[tuple[datetime, asyncio.Task]] = deque()
+
+        async def fetch(window_start: datetime, window_end: datetime):
+            return await self.api.get_consumption(
+                self.meter_reader,
+                self.customer_id,
+                window_start,
+                window_end,
+                cache_store=False,
+            )
+
+        # windows an interrupted run already fetched are skipped
+        windows = [
+            window
+            for window in windows
+            if self.coverage.missing(
+                int(max(window[0], start).timestamp()), int(window[1].timestamp())
+            )
+        ]
+
+        try:
+            for index, (window_start, _window_end) in enumerate(windows):
+                # fetch at most BACKFILL_CONCURRENCY windows ahead but handle them in order
+                while len(pending) < BACKFILL_CONCURRENCY and index + len(pending) < len(windows):
+                    ahead_start, ahead_end = windows[index + len(pending)]
+                    pending.append(
+                        (ahead_start, asyncio.create_task(fetch(max(ahead_start, start), ahead_end)))
+                    )
+                _, task = pending.popleft()
+                self._add_history(await task, max(window_start, start))
+                await self._async_save()
+        finally:
+            for _, task in pending:
+                task.cancel()
+        _LOGGER.debug(
+            "statistics of %s backfilled from %s", self.meter_reader, self.first_start
+        )
+
+    def _add_history(self, response, start: datetime) -> None:
+        """Add the hours of a response before the first imported hour."""
+        state = self._state
+        first_start = int(self.first_start.timestamp())
+        hours: dict[int, float] = {}
+        for measurement in decode_verbrauch(response):
+            if int(start.timestamp()) <= measurement.start < first_start:
+                self.coverage.add(measurement.start, min(measurement.end, first_start))
+                hour = measurement.start - measurement.start % 3600
+                hours[hour] = hours.get(hour, 0.0) + measurement.value
+        if not hours:
+            return
+        total = state["first_sum"]
+        statistics = []
+        for hour in sorted(hours, reverse=True):
+            statistics.append(
+                StatisticData(start=dt_util.utc_from_timestamp(hour), state=hours[hour], sum=total)
+            )
+            total -= hours[hour]
+        statistics.reverse()
+        async_add_external_statistics(self.hass, self.metadata, statistics)
+        state["first_start"] = statistics[0]["start"].isoformat()
+        state["first_sum"] = total
+
+    async def async_import(self) -> None:
+        """Import everything between the high water mark and now."""
+        await self._async_load()
+        now = dt_util.now()
+        start = self.high_water_mark
+        if start is None:
+            start = now - timedelta(days=STATISTICS_BACKFILL_DAYS)
+        # after a restart the series is refilled for the derived sensors
+        if not self._warmed_up:
+            start = min(start, now - timedelta(days=SERIES_WARMUP_DAYS))
+        # backfill in bounded windows and persist after each of them
+        for window_start, window_end in aligned_windows(start, now):
+            response = await self.api.get_consumption(
+                self.meter_reader, self.customer_id, window_start, window_end
+            )
+            self.add_response(response)
+            await self._async_save()
+        self._warmed_up = True
+        await self._async_refill(now)
+        self.series.trim(int((now - timedelta(days=SERIES_RETENTION_DAYS)).timestamp()))
+        _LOGGER.debug(
+            "statistics of %s imported until %s", self.meter_reader, self.high_water_mark
+        )
+
+    async def _async_refill(self, now: datetime) -> None:
+        """Refetch the recent holes and rebuild the sums from the first of them.
+
+        Only the days that are not finalized yet are checked, older windows
+        are cached for good and upstream does not correct them anymore.
+        """
+        if (last_end := self.high_water_mark) is None or self.coverage.first is None:
+            return
+        until = int(last_end.timestamp())
+        since = int((now - timedelta(days=COVERAGE_REFETCH_DAYS)).timestamp())
+        missing = self.coverage.missing(max(self.coverage.first, since), until)
+        if not missing:
+            return
+        hour = missing[0][0] - missing[0][0] % 3600
+        previous = self.series.sum(hour, until)
+        for window_start, window_end in coalesce(
+            missing, COVERAGE_MAX_GAP, STATISTICS_WINDOW_DAYS * 86400
+        ):
+            response = await self.api.get_consumption(
+                self.meter_reader,
+                self.customer_id,
+                dt_util.utc_from_timestamp(window_start),
+                dt_util.utc_from_timestamp(window_end),
+            )
+            self._add_measurements(response)
+        if self.series.sum(hour, until) != previous:
+            self.revised_from = min(hour, self.revised_from or hour)
+        statistics = self._hourly(hour, until, self._state["sum"] - previous)
+        if statistics:
+            async_add_external_statistics(self.hass, self.metadata, statistics)
+            self._state["sum"] = statistics[-1]["sum"]
+        await self._async_save()
+        _LOGGER.debug(
+            "statistics of %s refilled, %s of %s holes left",
+            self.meter_reader,
+            len(self.coverage.missing(max(self.coverage.first, since), until)),
+            len(missing),
+        )
@@ -0,0 +1,376 @@
+"""Tariffs and the cost of a meter's consumption."""
+from __future__ import annotations
+import csv
+import logging
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .hourly import HourlyEngine
+from .series import IntervalSeries
+from .const import (
+    DOMAIN,
+    TIMEZONE,
+    CONF_TARIFF_TYPE,
+    CONF_TARIFF_PRICE,
+    CONF_TARIFF_SCHEDULE,
+    CONF_TARIFF_FILE,
+    CONF_TARIFF_ENTITY,
+    TARIFF_FLAT,
+    TARIFF_TIME_OF_USE,
+    TARIFF_FILE,
+    TARIFF_ENTITY,
+    COST_STORAGE_VERSION,
+    COST_DAYS,
+    ATTR_COST_YESTERDAY,
+    ATTR_COST_MONTH_TO_DATE,
+)
+
+# numpy is optional and only imported by the first pricing
+_HAS_NUMPY = find_spec("numpy") is not None
+
+_LOGGER = logging.getLogger(__name__)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def _utcoffset(timestamp: int, time_zone) -> int:
+    local = dt_util.utc_from_timestamp(timestamp).astimezone(time_zone)
+    return int(local.utcoffset().total_seconds())
+
+
+def _local_hours_of_week(timestamps: array, time_zone) -> list[int]:
+    return [
+        (local := dt_util.utc_from_timestamp(timestamp).astimezone(time_zone)).weekday() * 24
+        + local.hour
+        for timestamp in timestamps
+    ]
+
+
+def _offset_hours_of_week(timestamps: array, offset: int) -> Sequence[int]:
+    # the epoch is a thursday, which is hour 72 of its week
+    if _HAS_NUMPY:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return ((np.frombuffer(timestamps, dtype=np.int64) + offset) // 3600 + 72) % 168
+    return [((timestamp + offset) // 3600 + 72) % 168 for timestamp in timestamps]
+
+
+def hours_of_week(timestamps: array, time_zone) -> Sequence[int]:
+    """Return the local hour of the week (monday 0:00 is 0) of sorted epoch timestamps.
+
+    Daylight saving switches are months apart, so a day of intervals has at
+    most one. Runs of one UTC offset grow a day at a time while the offset
+    at the start and end of the day is unchanged, and only the intervals of
+    a day with a switch are converted one by one.
+    """
+    chunks: list[Sequence[int]] = []
+    low = 0
+    while low < len(timestamps):
+        offset = _utcoffset(timestamps[low], time_zone)
+        high = low
+        while high < len(timestamps):
+            day_end = bisect_left(timestamps, timestamps[high] + 86400, high)
+            if (
+                _utcoffset(timestamps[high], time_zone) != offset
+                or _utcoffset(timestamps[day_end - 1], time_zone) != offset
+            ):
+                break
+            high = day_end
+        if high > low:
+            chunks.append(_offset_hours_of_week(timestamps[low:high], offset))
+        else:
+            high = bisect_left(timestamps, timestamps[low] + 86400, low)
+            chunks.append(_local_hours_of_week(timestamps[low:high], time_zone))
+        low = high
+    if _HAS_NUMPY:
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        return np.concatenate([np.asarray(chunk, dtype=np.int64) for chunk in chunks or [[]]])
+    return [hour for chunk in chunks for hour in chunk]
+
+
+def parse_schedule(schedule: str) -> list[float]:
+    """Parse a time of use schedule into a price per hour of the week.
+
+    Rules are separated by ``;`` and look like ``mon-fri 06-22=0.28`` or
+    ``22-06=0.19``. Rules without days apply to every day, later rules win
+    and day and hour ranges may wrap around, like ``fri-mon`` or ``22-06``.
+    Raises ValueError for a schedule without rules, a rule that does not
+    parse or a schedule that leaves an hour of the week without a price.
+    """
+    table: list[float | None] = [None] * 168
+    rules = [rule.strip() for rule in schedule.split(";") if rule.strip()]
+    if not rules:
+        raise ValueError("The schedule has no rules")
+    for rule in rules:
+        hours, separator, price = rule.rpartition("=")
+        parts = hours.split()
+        if not separator or not 1 <= len(parts) <= 2:
+            raise ValueError(f"Rule {rule!r} is not [days] hours=price")
+        days = _parse_days(parts[0]) if len(parts) == 2 else range(7)
+        start, end = _parse_hours(parts[-1])
+        hour_range = range(start, end) if start < end else [*range(start, 24), *range(end)]
+        value = float(price)
+        for day in days:
+            for hour in hour_range:
+                table[day * 24 + hour] = value
+    if None in table:
+        day, hour = divmod(table.index(None), 24)
+        raise ValueError(f"The schedule has no price for {WEEKDAYS[day]} {hour:02d}-{hour + 1:02d}")
+    return table
+
+
+def _parse_hours(hours: str) -> tuple[int, int]:
+    start, separator, end = hours.partition("-")
+    if not separator or not start.isdigit() or not end.isdigit():
+        raise ValueError(f"Hours {hours!r} are not start-end")
+    if not 0 <= int(start) <= 23 or not 0 <= int(end) <= 24:
+        raise ValueError(f"Hours {hours!r} are not between 0 and 24")
+    return int(start), int(end)
+
+
+def _parse_day(day: str) -> int:
+    if day not in WEEKDAYS:
+        raise ValueError(f"Unknown day {day!r}, use {', '.join(WEEKDAYS)}")
+    return WEEKDAYS.index(day)
+
+
+def _parse_days(days: str) -> list[int]:
+    result = []
+    for part in days.lower().split(","):
+        if "-" in part:
+            first, last = (_parse_day(day) for day in part.split("-", 1))
+            # fri-mon wraps around the end of the week
+            result.extend((first + offset) % 7 for offset in range((last - first) % 7 + 1))
+        else:
+            result.append(_parse_day(part))
+    return result
+
+
+class Tariff(ABC):
+    """Price per kWh of intervals."""
+
+    async def async_setup(self, hass: HomeAssistant) -> None:
+        """Load what the tariff needs."""
+
+    @abstractmethod
+    def prices(self, timestamps: array) -> Sequence[float]:
+        """Return the price of each interval start."""
+
+
+class FlatTariff(Tariff):
+    """One price for every interval."""
+
+    def __init__(self, price: float) -> None:
+        """Initialize the tariff."""
+        self.price = price
+
+    def prices(self, timestamps: array) -> Sequence[float]:
+        """Return the price of each interval start."""
+        return [self.price] * len(timestamps)
+
+
+class TimeOfUseTariff(Tariff):
+    """Prices by local hour of the week from a precomputed table."""
+
+    def __init__(self, schedule: str) -> None:
+        """Initialize the tariff."""
+        self.table = parse_schedule(schedule)
+        self._time_zone = dt_util.get_time_zone(TIMEZONE)
+
+    def prices(self, timestamps: array) -> Sequence[float]:
+        """Return the price of each interval start."""
+        hours = hours_of_week(timestamps, self._time_zone)
+        if _HAS_NUMPY:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+
+            return np.asarray(self.table)[np.asarray(hours, dtype=np.int64)]
+        return [self.table[hour] for hour in hours]
+
+
+class PriceSeriesTariff(Tariff):
+    """Prices that are valid from a point in time until the next one."""
+
+    def __init__(self, path: str | None = None) -> None:
+        """Initialize the tariff, loading the prices from a csv file."""
+        self.path = path
+        self.starts = array("q")
+        self.values = array("d")
+
+    def _load(self) -> None:
+        """Read ``start,price`` rows, the start in ISO format."""
+        rows = []
+        with open(self.path, encoding="utf-8") as price_file:
+            for row in csv.reader(price_file):
+                if len(row) < 2 or (start := dt_util.parse_datetime(row[0].strip())) is None:
+                    continue
+                if start.tzinfo is None:
+                    start = start.replace(tzinfo=dt_util.get_time_zone(TIMEZONE))
+                rows.append((int(start.timestamp()), float(row[1])))
+        rows.sort()
+        self.starts = array("q", (start for start, _ in rows))
+        self.values = array("d", (price for _, price in rows))
+
+    async def async_setup(self, hass: HomeAssistant) -> None:
+        """Load the price file."""
+        await hass.async_add_executor_job(self._load)
+
+    def prices(self, timestamps: array) -> Sequence[float]:
+        """Return the price of each interval start."""
+        if not self.starts:
+            raise ValueError(f"No prices in {self.path}")
+        if _HAS_NUMPY:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+
+            indices = np.searchsorted(
+                np.frombuffer(self.starts, dtype=np.int64),
+                np.frombuffer(timestamps, dtype=np.int64),
+                side="right",
+            )
+            return np.frombuffer(self.values, dtype=np.float64)[np.maximum(indices - 1, 0)]
+        return [
+            self.values[max(bisect_right(self.starts, timestamp) - 1, 0)]
+            for timestamp in timestamps
+        ]
+
+
+class EntityTariff(Tariff):
+    """The current state of an entity as price of new intervals."""
+
+    def __init__(self, entity_id: str) -> None:
+        """Initialize the tariff."""
+        self.entity_id = entity_id
+        self.hass: HomeAssistant | None = None
+
+    async def async_setup(self, hass: HomeAssistant) -> None:
+        """Remember hass to read the state."""
+        self.hass = hass
+
+    def prices(self, timestamps: array) -> Sequence[float]:
+        """Return the price of each interval start."""
+        state = self.hass.states.get(self.entity_id)
+        if state is None:
+            raise ValueError(f"{self.entity_id} not found")
+        return [float(state.state)] * len(timestamps)
+
+
+def tariff_from_options(options: Mapping[str, Any]) -> Tariff | None:
+    """Return the tariff configured in the options of an entry."""
+    tariff_type = options.get(CONF_TARIFF_TYPE)
+    if tariff_type == TARIFF_FLAT:
+        return FlatTariff(options[CONF_TARIFF_PRICE])
+    if tariff_type == TARIFF_TIME_OF_USE:
+        return TimeOfUseTariff(options[CONF_TARIFF_SCHEDULE])
+    if tariff_type == TARIFF_FILE:
+        return PriceSeriesTariff(options[CONF_TARIFF_FILE])
+    if tariff_type == TARIFF_ENTITY:
+        return EntityTariff(options[CONF_TARIFF_ENTITY])
+    return None
+
+
+class CostEngine(HourlyEngine):
+    """Prices the new intervals of a series and keeps the costs.
+
+    Hourly costs are added as external statistics, daily costs back the
+    cost sensors.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        meter_reader: str,
+        series: IntervalSeries,
+        tariff: Tariff,
+    ) -> None:
+        """Initialize the engine."""
+        super().__init__(hass, meter_reader, series, COST_STORAGE_VERSION, "cost")
+        self.tariff = tariff
+
+    @property
+    def metadata(self) -> StatisticMetaData:
+        """Return the statistic metadata of the costs."""
+        return StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=f"WienerNetze {self.meter_reader} cost",
+            source=DOMAIN,
+            statistic_id=f"{DOMAIN}:{self.meter_reader.lower()}_cost",
+            unit_of_measurement=self.hass.config.currency,
+        )
+
+    async def _async_setup(self, state: dict[str, Any]) -> None:
+        await self.tariff.async_setup(self.hass)
+        state.setdefault("sum", 0.0)
+        state.setdefault("days", {})
+
+    def _values(self, timestamps: array, values: array) -> Sequence[float]:
+        """Return the cost of every interval."""
+        prices = self.tariff.prices(timestamps)
+        if _HAS_NUMPY:
+            import numpy as np  # pylint: disable=import-outside-toplevel
+
+            return (np.frombuffer(values, dtype=np.float64) * np.asarray(prices)).tolist()
+        return [value * price for value, price in zip(values, prices)]
+
+    def _add_statistics(self, total: float, hours: dict[int, float]) -> float:
+        """Add the hourly costs on top of the sum before them, return the new sum."""
+        statistics = []
+        for hour in sorted(hours):
+            total += hours[hour]
+            statistics.append(
+                StatisticData(start=dt_util.utc_from_timestamp(hour), state=hours[hour], sum=total)
+            )
+        async_add_external_statistics(self.hass, self.metadata, statistics)
+        return total
+
+    def _add_hours(self, state: dict[str, Any], hours: dict[int, float]) -> None:
+        days = state["days"]
+        time_zone = dt_util.get_time_zone(TIMEZONE)
+        for hour, cost in hours.items():
+            day = dt_util.utc_from_timestamp(hour).astimezone(time_zone).date().isoformat()
+            days[day] = days.get(day, 0.0) + cost
+        state["sum"] = self._add_statistics(state["sum"], hours)
+
+        oldest = (dt_util.now().date() - timedelta(days=COST_DAYS)).isoformat()
+        for day in [day for day in days if day < oldest]:
+            del days[day]
+
+    def _revise_hours(
+        self, state: dict[str, Any], changed: dict[int, tuple[float | None, float]]
+    ) -> None:
+        days = state["days"]
+        time_zone = dt_util.get_time_zone(TIMEZONE)
+        for hour, (before, after) in changed.items():
+            day = dt_util.utc_from_timestamp(hour).astimezone(time_zone).date().isoformat()
+            days[day] = days.get(day, 0.0) + after - (before or 0.0)
+        # the sums of all later hours move as well, so they are added again
+        first = min(changed)
+        hours = {
+            int(hour): cost for hour, cost in state["recent"].items() if int(hour) >= first
+        }
+        previous = sum(before or 0.0 for before, _ in changed.values())
+        revised = sum(after for _, after in changed.values())
+        total = state["sum"] - previous + revised
+        state["sum"] = self._add_statistics(total - sum(hours.values()), hours)
+
+    def _sensor_values(self, state: dict[str, Any], now: datetime) -> dict[str, float]:
+        days = state["days"]
+        values = {}
+        yesterday = (now.date() - timedelta(days=1)).isoformat()
+        if yesterday in days:
+            values[ATTR_COST_YESTERDAY] = days[yesterday]
+        month = now.date().isoformat()[:7]
+        month_days = [cost for day, cost in days.items() if day.startswith(month)]
+        if month_days:
+            values[ATTR_COST_MONTH_TO_DATE] = sum(month_days)
+        return values